@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# --- Settings ---
+# Each user may send RATE_BURST messages at once, refilled at RATE_PER_MINUTE
+RATE_PER_MINUTE = float(os.environ.get("WELLBOT_RATE_PER_MINUTE", 20))
+RATE_BURST = float(os.environ.get("WELLBOT_RATE_BURST", 5))
+# At most MAX_CONCURRENT replies are computed at once; up to MAX_QUEUED more
+# wait for a slot, each for at most QUEUE_TIMEOUT seconds
+MAX_CONCURRENT = int(os.environ.get("WELLBOT_MAX_CONCURRENT_REPLIES", 4))
+MAX_QUEUED = int(os.environ.get("WELLBOT_MAX_QUEUED_REPLIES", 16))
+QUEUE_TIMEOUT = float(os.environ.get("WELLBOT_QUEUE_TIMEOUT", 2.0))
+# Buckets of the least recently seen users are forgotten beyond this many
+MAX_TRACKED_USERS = 10000
+
+# Rejection reasons, also the language pack template names
+RATE_LIMITED = "rate_limited"
+SERVER_BUSY = "server_busy"
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate_per_second: float, capacity: float, now: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class AdmissionController:
+    """Per-user rate limit plus a global cap on replies computed at once.
+
+    acquire() returns None when the request may run (release() must follow)
+    or the rejection reason. Rejections cost one dict lookup and no I/O.
+    """
+
+    def __init__(self, rate_per_minute: float = RATE_PER_MINUTE, burst: float = RATE_BURST,
+                 max_concurrent: int = MAX_CONCURRENT, max_queued: int = MAX_QUEUED,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._buckets = OrderedDict()
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._counters = {"admitted": 0, "queued": 0, "rate_limited": 0, "rejected_busy": 0, "timed_out": 0}
+
+    def _take_token(self, user_id: str, now: float) -> bool:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > MAX_TRACKED_USERS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket.take(now)
+
+    def acquire(self, user_id: str) -> Optional[str]:
+        with self._cond:
+            if not self._take_token(user_id, time.monotonic()):
+                self._counters["rate_limited"] += 1
+                return RATE_LIMITED
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queued:
+                    self._counters["rejected_busy"] += 1
+                    return SERVER_BUSY
+                self._counters["queued"] += 1
+                self._waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._active < self.max_concurrent,
+                                                   timeout=self.queue_timeout)
+                finally:
+                    self._waiting -= 1
+                if not admitted:
+                    self._counters["timed_out"] += 1
+                    return SERVER_BUSY
+            self._active += 1
+            self._counters["admitted"] += 1
+            return None
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"active": self._active, "waiting": self._waiting, **self._counters}
+
+
+ADMISSION = AdmissionController()
+
+
+def get_admission_stats() -> Dict[str, int]:
+    return ADMISSION.stats()
@@ -8,21 +8,30 @@ from datetime import datetime
 import pandas as pd 
 import plotly.express as px # Import Plotly for better charts
 
+from db_instrumentation import connect, get_query_stats, get_slow_queries, get_counters, SLOW_QUERY_MS, QUERY_LOG_PATH
+from language_packs import get_pack, available_languages
+from kb_import import import_kb, detect_format
+from admission import ADMISSION, get_admission_stats
+from schema import ensure_schema
+
 # ==============================================================================
 # DATABASE & KNOWLEDGE BASE PATHS
 # ==============================================================================
+# WELLBOT_DATA_DIR moves the SQLite files elsewhere (e.g. for load tests)
+DATA_DIR = os.environ.get("WELLBOT_DATA_DIR", os.path.dirname(__file__))
 KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(__file__), "knowledge_base.json")
-USER_DB_PATH = os.path.join(os.path.dirname(__file__), "user_management.db")
-FEEDBACK_DB_PATH = os.path.join(os.path.dirname(__file__), "feedback_data.db")
-CHAT_DB_PATH = os.path.join(os.path.dirname(__file__), "knowledge_base.db") 
+USER_DB_PATH = os.path.join(DATA_DIR, "user_management.db")
+FEEDBACK_DB_PATH = os.path.join(DATA_DIR, "feedback_data.db")
+CHAT_DB_PATH = os.path.join(DATA_DIR, "knowledge_base.db") 
 
 # ==============================================================================
 # FALLBACK IMPORTS (Ensuring app runs even if external files are missing)
 # ==============================================================================
 try:
-    from knowledge_base import (save_chat_to_db, get_chat_history, get_response_from_db, load_kb, format_health_info)
-    from dialogue_manager import (get_bot_reply, detect_rule_based_intent, detect_input_language)
-    KNOWLEDGE_BASE = load_kb()
+    from knowledge_base import (save_chat_to_db, get_chat_history, get_response_from_db, format_health_info)
+    from dialogue_manager import (get_bot_reply, detect_rule_based_intent, detect_input_language, get_session_stats, apply_kb_change, apply_kb_bulk_change)
+    from kb_model import get_shared_kb
+    KNOWLEDGE_BASE = get_shared_kb()
     IMPORT_SUCCESS = True
 
 except ImportError as e:
@@ -35,12 +44,17 @@ except ImportError as e:
         elif any(keyword in msg.lower() for keyword in ["tip", "advise", "prevention", "health"]): return "Prevention"
         return "General"
     def detect_input_language(text): return 'English'
+    def get_session_stats(): return {"live": 0, "expired": 0, "evicted": 0}
+    def apply_kb_change(name, info=None):
+        if info is None: KNOWLEDGE_BASE.pop(name, None)
+        else: KNOWLEDGE_BASE[name] = info
+    def apply_kb_bulk_change(entries): KNOWLEDGE_BASE.update(entries)
     def save_chat_to_db(user, msg, intent, reply): pass # Does nothing in fallback
     
     # Dummy chat history retrieval to populate charts if DB access fails
     def get_chat_history(user=None): 
         try:
-            conn = sqlite3.connect(CHAT_DB_PATH); c = conn.cursor()
+            conn = connect(CHAT_DB_PATH); c = conn.cursor()
             c.execute('''CREATE TABLE IF NOT EXISTS chat_history (timestamp DATETIME, username TEXT, user_message TEXT, bot_reply TEXT, detected_intent TEXT)''')
             conn.commit()
             query = "SELECT timestamp, username, user_message, bot_reply, detected_intent FROM chat_history"
@@ -63,22 +77,8 @@ except ImportError as e:
 # ==============================================================================
 # DATABASE INITIALIZATION
 # ==============================================================================
-def init_user_db():
-    conn = sqlite3.connect(USER_DB_PATH); c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL, email TEXT NOT NULL, full_name TEXT NOT NULL, age INTEGER NOT NULL, gender TEXT NOT NULL, language TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit(); conn.close()
-
-def init_feedback_db():
-    conn = sqlite3.connect(FEEDBACK_DB_PATH); c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, user_query TEXT NOT NULL, bot_reply TEXT NOT NULL, is_positive INTEGER NOT NULL, comment TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit(); conn.close()
-    
-def init_chat_db():
-    conn = sqlite3.connect(CHAT_DB_PATH); c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS chat_history (timestamp DATETIME, username TEXT, user_message TEXT, bot_reply TEXT, detected_intent TEXT)''')
-    conn.commit(); conn.close()
-
-init_user_db(); init_feedback_db(); init_chat_db()
+# Migrations run once per process; on every later rerun this is a set lookup
+ensure_schema(USER_DB_PATH, FEEDBACK_DB_PATH, CHAT_DB_PATH)
 
 
 # ==============================================================================
@@ -94,13 +94,7 @@ if 'last_user_query' not in st.session_state: st.session_state.last_user_query =
 if 'show_feedback_form' not in st.session_state: st.session_state.show_feedback_form = False
 if 'feedback_prompted' not in st.session_state: st.session_state.feedback_prompted = False
 
-translations = {
-    'English': {'register': 'Register', 'login': 'Login', 'profile_update': 'Profile Update', 'chat': 'Chat', 'username': 'Username', 'password': 'Password', 'email': 'Email', 'full_name': 'Full Name', 'age': 'Age', 'gender': 'Gender', 'male': 'Male', 'female': 'Female', 'other': 'Other', 'submit': 'Submit', 'logout': 'Logout', 'welcome': 'Welcome', 'type_message': 'Type your message...', 'send': 'Send', 'login_success': 'Login successful!', 'register_success': 'Registration successful! Please login.', 'profile_update_success': 'Profile updated successfully!', 'select_language': 'Select Language', 'view_chat_history': 'View Chat History', 'view_database': 'View Database', 'admin_panel': 'Admin Panel', 'access_denied': 'Access Denied. You must be logged in as an Admin.'},
-    'Telugu': {'register': 'నమోదు', 'login': 'లాగిన్', 'profile_update': 'ప్రొఫైల్ నవీకరణ', 'chat': 'చాట్', 'username': 'వినియోగదారు పేరు', 'password': 'పాస్వర్డ్', 'email': 'ఇమెయిల్', 'full_name': 'పూర్తి పేరు', 'age': 'వయస్సు', 'gender': 'లింగం', 'male': 'పురుషుడు', 'female': 'స్త్రీ', 'other': 'ఇతర', 'submit': 'సమర్పించండి', 'logout': 'లాగ్అవుట్', 'welcome': 'స్వాగతం', 'type_message': 'మీ సందేశాన్ని టైప్ చేయండి...', 'send': 'పంపండి', 'login_success': 'లాగిన్ విజయవంతమైనది!', 'register_success': 'నమోదు విజయవంతమైనది! దయచేసి లాగిన్ చేయండి.', 'profile_update_success': 'ప్రొఫైల్ విజయవంతంగా నవీకరించబడింది!', 'select_language': 'భాషను ఎంచుకోండి', 'view_chat_history': 'చాట్ చరిత్రను వీక్షించండి', 'view_database': 'డేటాబేస్ వీక్షించండి', 'admin_panel': 'అడ్మిన్ ప్యానెల్', 'access_denied': 'యాక్సెస్ నిరాకరించబడింది. మీరు అడ్మిన్‌గా లాగిన్ అయి ఉండాలి।'},
-    'Hindi': {'register': 'पंजीकरण', 'login': 'लॉगिन', 'profile_update': 'प्रोफाइल अद्यतन', 'chat': 'चैट', 'username': 'उपयोगकर्ता नाम', 'password': 'पास्सवर्ड', 'email': 'ईमेल', 'full_name': 'पूरा नाम', 'age': 'उम्र', 'gender': 'लिंग', 'male': 'पुरुष', 'female': 'महिला', 'other': 'अन्य', 'submit': 'जमा करें', 'logout': 'लॉगआउट', 'welcome': 'स्वागत है', 'type_message': 'अपना संदेश टाइप करें...', 'send': 'भेजें', 'login_success': 'लॉगिन सफल!', 'register_success': 'पंजीकरण सफल! कृपया लॉगिन करें।', 'profile_update_success': 'प्रोफाइल सफलतापूर्वक अपडेट की गई!', 'select_language': 'भाषा चुनें', 'view_chat_history': 'चैट इतिहास देखें', 'view_database': 'डेटाबेस देखें', 'admin_panel': 'एडमिन पैनल', 'access_denied': 'पहुंच अस्वीकृत। आपको व्यवस्थापक के रूप में लॉग इन होना चाहिए।'}
-}
-
-def translate(key): return translations.get(st.session_state.language, translations['English']).get(key, key)
+def translate(key): return get_pack(st.session_state.language).translate(key)
 def navigate_to(page): st.session_state.page = page
 
 # ==============================================================================
@@ -108,14 +102,14 @@ def navigate_to(page): st.session_state.page = page
 # ==============================================================================
 def hash_password(password): return hashlib.sha256(password.encode()).hexdigest()
 def login_user(username, password):
-    conn = sqlite3.connect(USER_DB_PATH); c = conn.cursor()
+    conn = connect(USER_DB_PATH); c = conn.cursor()
     c.execute("SELECT * FROM users WHERE username=?", (username,)); user = c.fetchone(); conn.close()
     if user and user[2] == hash_password(password):
         st.session_state.logged_in = True; st.session_state.username = username; st.session_state.language = user[7]; navigate_to('Chat'); return True
     return False
 
 def register_user(username, password, email, full_name, age, gender, language):
-    conn = sqlite3.connect(USER_DB_PATH); c = conn.cursor()
+    conn = connect(USER_DB_PATH); c = conn.cursor()
     try:
         c.execute('''INSERT INTO users (username, password, email, full_name, age, gender, language) VALUES (?, ?, ?, ?, ?, ?, ?)''', (username, hash_password(password), email, full_name, age, gender, language))
         conn.commit(); conn.close(); return True
@@ -123,18 +117,18 @@ def register_user(username, password, email, full_name, age, gender, language):
     except Exception as e: conn.close(); st.error(f"Registration error: {e}"); return False
 
 def get_all_users():
-    conn = sqlite3.connect(USER_DB_PATH); c = conn.cursor()
+    conn = connect(USER_DB_PATH); c = conn.cursor()
     users = c.execute("SELECT username, email, full_name, age, gender, language, created_at FROM users").fetchall(); conn.close(); return users
 
 def get_all_feedback_data():
-    conn = sqlite3.connect(FEEDBACK_DB_PATH); c = conn.cursor()
+    conn = connect(FEEDBACK_DB_PATH); c = conn.cursor()
     feedback = c.execute("SELECT id, username, user_query, bot_reply, is_positive, comment, timestamp FROM feedback ORDER BY timestamp DESC").fetchall(); conn.close(); return feedback
 
 def get_user_conversations(username): return get_chat_history(username)
 def get_all_chats(): return get_chat_history(username=None)
 def save_feedback_to_db(username, user_query, bot_reply, is_positive, comment):
     try:
-        conn = sqlite3.connect(FEEDBACK_DB_PATH); c = conn.cursor()
+        conn = connect(FEEDBACK_DB_PATH); c = conn.cursor()
         c.execute('''INSERT INTO feedback (username, user_query, bot_reply, is_positive, comment) VALUES (?, ?, ?, ?, ?)''', (username, user_query, bot_reply, is_positive, comment))
         conn.commit(); conn.close(); return True
     except Exception as e: st.error(f"Error saving feedback: {e}"); return False
@@ -144,6 +138,7 @@ def save_feedback_to_db(username, user_query, bot_reply, is_positive, comment):
 # ==============================================================================
 def save_kb_to_file(kb_data):
     try:
+        if hasattr(kb_data, 'to_dict'): kb_data = kb_data.to_dict()
         with open(KNOWLEDGE_BASE_PATH, 'w', encoding='utf-8') as f:
             json.dump(kb_data, f, indent=4, ensure_ascii=False)
         return True
@@ -157,17 +152,19 @@ def add_kb_entry(name, desc_en, symptoms_en, treatment_en):
     if key in KNOWLEDGE_BASE:
         st.error(f"Entry '{key}' already exists in the Knowledge Base.")
         return False
-    KNOWLEDGE_BASE[key] = new_entry
+    apply_kb_change(key, new_entry)
     return save_kb_to_file(KNOWLEDGE_BASE)
 
 def update_kb_entry(original_name, new_data):
     global KNOWLEDGE_BASE 
     key = original_name.strip()
     if key in KNOWLEDGE_BASE:
-        KNOWLEDGE_BASE[key]['description'] = new_data['description']
-        KNOWLEDGE_BASE[key]['symptoms'] = [s.strip() for s in new_data['symptoms'].split(',')]
-        KNOWLEDGE_BASE[key]['treatment'] = [t.strip() for t in new_data['treatment'].split(',')]
+        entry = dict(KNOWLEDGE_BASE[key])
+        entry['description'] = new_data['description']
+        entry['symptoms'] = [s.strip() for s in new_data['symptoms'].split(',')]
+        entry['treatment'] = [t.strip() for t in new_data['treatment'].split(',')]
         # Preserve other language translations if they exist
+        apply_kb_change(key, entry)
         return save_kb_to_file(KNOWLEDGE_BASE)
     return False
 
@@ -175,7 +172,7 @@ def delete_kb_entry(name):
     global KNOWLEDGE_BASE 
     key = name.strip()
     if key in KNOWLEDGE_BASE:
-        del KNOWLEDGE_BASE[key]
+        apply_kb_change(key, None)
         return save_kb_to_file(KNOWLEDGE_BASE)
     return False
 
@@ -194,7 +191,7 @@ def render_login():
 def render_register(): 
     st.title(translate('register')); 
     with st.form("register_form"):
-        username = st.text_input(translate('username')); password = st.text_input(translate('password'), type="password"); email = st.text_input(translate('email')); full_name = st.text_input(translate('full_name')); age = st.number_input(translate('age'), min_value=1, max_value=120, value=25); gender = st.selectbox(translate('gender'), options=[translate('male'), translate('female'), translate('other')]); language = st.selectbox(translate('select_language'), options=list(translations.keys()), index=0)
+        username = st.text_input(translate('username')); password = st.text_input(translate('password'), type="password"); email = st.text_input(translate('email')); full_name = st.text_input(translate('full_name')); age = st.number_input(translate('age'), min_value=1, max_value=120, value=25); gender = st.selectbox(translate('gender'), options=[translate('male'), translate('female'), translate('other')]); language = st.selectbox(translate('select_language'), options=available_languages(), index=0)
         submitted = st.form_submit_button(translate('register'))
         if submitted:
             if register_user(username, password, email, full_name, age, gender, language): st.success(translate('register_success')); navigate_to('Login'); st.rerun()
@@ -215,25 +212,49 @@ def render_chat():
         st.session_state.show_feedback_form = False; st.session_state.feedback_prompted = False; user_message = prompt
         st.session_state.chat_history.append({"role": "user", "content": user_message}); st.session_state.last_user_query = user_message
         with st.chat_message("user"): st.markdown(user_message)
-        intent = detect_rule_based_intent(user_message); language = st.session_state.language
-        bot_reply = get_bot_reply(user_id=st.session_state.username, user_message=user_message, intent=intent, language=language)
+        language = st.session_state.language
+        # Admission control: over-limit or overloaded requests get a canned reply, no engine or DB work
+        rejection = ADMISSION.acquire(st.session_state.username)
+        if rejection:
+            bot_reply = get_pack(language).render(rejection)
+            st.session_state.chat_history.append({"role": "assistant", "content": bot_reply})
+            with st.chat_message("assistant"): st.markdown(bot_reply)
+            st.rerun()
+        # The slot is held through the chat_history insert, so that write counts against the limit too
+        try:
+            intent = detect_rule_based_intent(user_message)
+            bot_reply = get_bot_reply(user_id=st.session_state.username, user_message=user_message, intent=intent, language=language)
+            save_chat_to_db(st.session_state.username, user_message, intent, bot_reply)
+        finally:
+            ADMISSION.release()
         st.session_state.chat_history.append({"role": "assistant", "content": bot_reply}); st.session_state.last_bot_reply = bot_reply
         with st.chat_message("assistant"): st.markdown(bot_reply)
-        save_chat_to_db(st.session_state.username, user_message, intent, bot_reply)
         st.session_state.feedback_prompted = True; st.rerun()
+    render_feedback()
+
+# Feedback widgets update state in callbacks, which run before the fragment
+# rerun, so a click reruns only this fragment and never the chat history above it
+def choose_feedback(is_positive):
+    st.session_state.feedback_type = is_positive; st.session_state.show_feedback_form = True; st.session_state.feedback_prompted = False
+
+def submit_feedback():
+    success = save_feedback_to_db(username=st.session_state.username, user_query=st.session_state.last_user_query, bot_reply=st.session_state.last_bot_reply, is_positive=1 if st.session_state.feedback_type else 0, comment=st.session_state.get('feedback_comment', ''))
+    st.session_state.feedback_saved = success; st.session_state.show_feedback_form = False; st.session_state.last_bot_reply = None
+
+@st.fragment
+def render_feedback():
     if st.session_state.get('feedback_prompted', False) and st.session_state.last_bot_reply:
         st.markdown("---"); st.subheader("Was this response helpful? (Feedback needed after every chat)"); col_feedback = st.columns([1, 1, 3])
-        if col_feedback[0].button("👍 Yes", key="fb_yes"): st.session_state.feedback_type = True; st.session_state.show_feedback_form = True; st.session_state.feedback_prompted = False; st.rerun() 
-        if col_feedback[1].button("👎 No", key="fb_no"): st.session_state.feedback_type = False; st.session_state.show_feedback_form = True; st.session_state.feedback_prompted = False; st.rerun() 
+        col_feedback[0].button("👍 Yes", key="fb_yes", on_click=choose_feedback, args=(True,))
+        col_feedback[1].button("👎 No", key="fb_no", on_click=choose_feedback, args=(False,))
     if st.session_state.get('show_feedback_form', False):
         feedback_type_text = "Positive" if st.session_state.feedback_type else "Negative"; st.info(f"You selected **{feedback_type_text}** feedback.")
         with st.form("feedback_form"):
-            comment = st.text_area("Optional Comment (for improvement):", "")
-            if st.form_submit_button("Submit Feedback"):
-                success = save_feedback_to_db(username=st.session_state.username, user_query=st.session_state.last_user_query, bot_reply=st.session_state.last_bot_reply, is_positive=1 if st.session_state.feedback_type else 0, comment=comment)
-                if success: st.success("Thank you for your feedback!")
-                else: st.error("Failed to save feedback.")
-                st.session_state.show_feedback_form = False; st.session_state.last_bot_reply = None; st.rerun()
+            st.text_area("Optional Comment (for improvement):", "", key="feedback_comment")
+            st.form_submit_button("Submit Feedback", on_click=submit_feedback)
+    saved = st.session_state.pop('feedback_saved', None)
+    if saved: st.success("Thank you for your feedback!")
+    elif saved is not None: st.error("Failed to save feedback.")
 
 def render_history(): 
     st.title(translate('view_chat_history')); history_data = get_user_conversations(st.session_state.username)
@@ -267,7 +288,7 @@ def render_navigation():
             if st.button(translate('logout'), use_container_width=True):
                 st.session_state.logged_in = False; st.session_state.username = None; st.session_state.last_bot_reply = None; st.session_state.show_feedback_form = False
                 st.success(f"{translate('logout')} successful!"); st.rerun()
-    st.sidebar.selectbox(translate('select_language'), options=list(translations.keys()), index=list(translations.keys()).index(st.session_state.language), key='language_selector', on_change=lambda: setattr(st.session_state, 'language', st.session_state.language_selector))
+    st.sidebar.selectbox(translate('select_language'), options=available_languages(), index=available_languages().index(st.session_state.language), key='language_selector', on_change=lambda: setattr(st.session_state, 'language', st.session_state.language_selector))
     if st.session_state.logged_in: st.sidebar.markdown(f"**{translate('welcome')}, {st.session_state.username}!**")
 
 
@@ -279,184 +300,255 @@ def render_admin():
         st.error(translate('access_denied')); return
 
     st.title(translate('admin_panel'))
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Dashboard", "Knowledge Base", "User Analytics", "Chat History", "Feedback"])
-
-    # ----------------------------------------------------
-    # TAB 1: DASHBOARD (Includes Charts and KPIs)
-    # ----------------------------------------------------
-    with tab1:
-        st.header("System Overview")
-        all_users = get_all_users(); all_chats_raw = get_all_chats(); all_feedback = get_all_feedback_data()
-        chat_df = pd.DataFrame(all_chats_raw) if all_chats_raw else pd.DataFrame(columns=['timestamp', 'detected_intent'])
-        
-        # KPI Calculations
-        total_users = len(all_users); total_queries = len(chat_df); total_kb_entries = len(KNOWLEDGE_BASE); total_feedback_count = len(all_feedback)
-        positive_feedback_count = sum(1 for _, _, _, _, is_positive, _, _ in all_feedback if is_positive == 1)
-        feedback_percent = positive_feedback_count * 100 // (total_feedback_count or 1)
-        
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Users", total_users); col2.metric("Total Queries", total_queries); col3.metric("KB Entries", total_kb_entries)
-        col4.metric("Positive Feedback", f"{positive_feedback_count}/{total_feedback_count} ({feedback_percent}%)")
+    # Only the selected tab runs; widgets inside a tab rerun just that tab's fragment
+    tab = st.radio("Admin section", ADMIN_TABS, horizontal=True, key="admin_tab", label_visibility="collapsed")
+    ADMIN_TABS[tab]()
+
+
+# ----------------------------------------------------
+# TAB 1: DASHBOARD (Includes Charts and KPIs)
+# ----------------------------------------------------
+@st.fragment
+def render_admin_dashboard():
+    st.header("System Overview")
+    all_users = get_all_users(); all_chats_raw = get_all_chats(); all_feedback = get_all_feedback_data()
+    chat_df = pd.DataFrame(all_chats_raw) if all_chats_raw else pd.DataFrame(columns=['timestamp', 'detected_intent'])
+
+    # KPI Calculations
+    total_users = len(all_users); total_queries = len(chat_df); total_kb_entries = len(KNOWLEDGE_BASE); total_feedback_count = len(all_feedback)
+    positive_feedback_count = sum(1 for _, _, _, _, is_positive, _, _ in all_feedback if is_positive == 1)
+    feedback_percent = positive_feedback_count * 100 // (total_feedback_count or 1)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Users", total_users); col2.metric("Total Queries", total_queries); col3.metric("KB Entries", total_kb_entries)
+    col4.metric("Positive Feedback", f"{positive_feedback_count}/{total_feedback_count} ({feedback_percent}%)")
+    session_stats = get_session_stats()
+    scol1, scol2, scol3 = st.columns(3)
+    scol1.metric("Live Sessions", session_stats["live"]); scol2.metric("Expired Sessions", session_stats["expired"]); scol3.metric("Evicted Sessions", session_stats["evicted"])
+    admission_stats = get_admission_stats()
+    acol1, acol2, acol3, acol4 = st.columns(4)
+    acol1.metric("Admitted Replies", admission_stats["admitted"]); acol2.metric("Queued Replies", admission_stats["queued"])
+    acol3.metric("Rate Limited", admission_stats["rate_limited"]); acol4.metric("Rejected (Busy)", admission_stats["rejected_busy"] + admission_stats["timed_out"])
+
+    st.markdown("---")
+    chart_col1, chart_col2 = st.columns(2)
+
+    # CHART 1: QUERY TRENDS OVER TIME
+    with chart_col1:
+        st.subheader("Query Trends Over Time")
+        if not chat_df.empty and 'timestamp' in chat_df.columns:
+            chat_df['timestamp'] = pd.to_datetime(chat_df['timestamp'])
+            query_counts = chat_df.set_index('timestamp').resample('D').size().rename("Queries")
+            fig = px.line(query_counts.reset_index(), x='timestamp', y='Queries', title="Queries per Day")
+            st.plotly_chart(fig, use_container_width=True)
+        else: st.info("No sufficient chat history data to plot query trends.")
+
+    # CHART 2: TOP QUERY CATEGORIES
+    with chart_col2:
+        st.subheader("Top Query Categories")
+        if not chat_df.empty and 'detected_intent' in chat_df.columns:
+            intent_counts = chat_df['detected_intent'].value_counts().reset_index()
+            intent_counts.columns = ['Intent', 'Count']
+            fig = px.pie(intent_counts, values='Count', names='Intent', title='Distribution of Query Intents', hole=.3)
+            st.plotly_chart(fig, use_container_width=True)
+        else: st.info("No intent data available for Top Query Categories chart.")
+
+    st.markdown("---")
+
+    st.subheader("Recent Feedback")
+    if all_feedback:
+        feedback_df = pd.DataFrame(all_feedback, columns=['ID', 'Username', 'Query', 'Reply', 'Positive', 'Comment', 'Timestamp'])
+        feedback_df['Positive'] = feedback_df['Positive'].apply(lambda x: '👍 Positive' if x == 1 else '👎 Negative')
+        st.dataframe(feedback_df[['Timestamp', 'Username', 'Query', 'Positive', 'Comment']].head(5), use_container_width=True)
+    else: st.info("No feedback yet.")
+
+
+# ----------------------------------------------------
+# TAB 2: KNOWLEDGE BASE MANAGEMENT 
+# ----------------------------------------------------
+@st.fragment
+def render_admin_kb():
+    st.header("Knowledge Base (KB) Management")
+
+    kb_tab1, kb_tab2, kb_tab3, kb_tab4 = st.tabs(["View/Edit Entries", "Add New Entry", "Delete Entry", "Bulk Import"])
+
+    # VIEW / EDIT
+    with kb_tab1:
+        st.subheader("View and Edit Existing Entries")
+        kb_names = list(KNOWLEDGE_BASE.keys())
+        if not kb_names:
+            st.warning("The knowledge base is empty.")
+        else:
+            selected_name = st.selectbox("Select Entry to View/Edit:", kb_names)
+            entry = KNOWLEDGE_BASE.get(selected_name, {})
+
+            with st.form(f"edit_form_{selected_name}", clear_on_submit=False):
+                new_description = st.text_area("Description (English)", entry.get('description', ''))
+                new_symptoms = st.text_area("Symptoms (Comma Separated, English)", ", ".join(entry.get('symptoms', [])))
+                new_treatment = st.text_area("Treatment/Tips (Comma Separated, English)", ", ".join(entry.get('treatment', [])))
+
+                if st.form_submit_button("Save Changes"):
+                    new_data = {'description': new_description, 'symptoms': new_symptoms, 'treatment': new_treatment}
+                    if update_kb_entry(selected_name, new_data):
+                        st.success(f"Entry '{selected_name}' updated successfully!")
+                        st.rerun()
+                    else: st.error("Failed to update entry.")
+
+    # ADD NEW
+    with kb_tab2:
+        st.subheader("Add a New Knowledge Base Entry")
+        with st.form("add_new_form", clear_on_submit=True):
+            new_name = st.text_input("New Entry Name (e.g., Dengue Fever)")
+            new_description = st.text_area("Description (English)")
+            new_symptoms = st.text_area("Symptoms (Comma Separated, English)")
+            new_treatment = st.text_area("Treatment/Tips (Comma Separated, English)")
+
+            if st.form_submit_button("Add New Entry"):
+                if new_name and new_description and new_symptoms and new_treatment:
+                    if add_kb_entry(new_name, new_description, new_symptoms, new_treatment):
+                        st.success(f"New entry '{new_name}' added successfully! Reloading...")
+                        st.rerun()
+                    # Error handled in add_kb_entry function
+                else: st.error("Please fill in all fields.")
+
+    # DELETE
+    with kb_tab3:
+        st.subheader("Delete Knowledge Base Entry")
+        kb_names = list(KNOWLEDGE_BASE.keys())
+        if kb_names:
+            delete_name = st.selectbox("Select Entry to Delete:", kb_names, key="delete_kb_select")
+            if st.button(f"Permanently Delete '{delete_name}'", type="primary"):
+                if delete_kb_entry(delete_name):
+                    st.success(f"Entry '{delete_name}' deleted successfully! Reloading...")
+                    st.rerun()
+                else: st.error("Failed to delete entry.")
+        else:
+            st.info("No entries available to delete.")
+
+    # BULK IMPORT
+    with kb_tab4:
+        st.subheader("Bulk Import from CSV / JSONL / JSON")
+        st.caption("CSV needs a 'name' column plus knowledge_base.json field names (e.g. description, symptoms, symptoms_hi); separate list items with ';'. JSONL holds one object per line with the same keys; JSON may use the knowledge_base.json layout.")
+        upload = st.file_uploader("Import file", type=["csv", "jsonl", "json"], key="kb_bulk_upload")
+        replace_existing = st.checkbox("Overwrite existing entries", key="kb_bulk_replace")
+        skip_invalid = st.checkbox("Import valid rows even if some rows fail", key="kb_bulk_skip")
+        col_check, col_import = st.columns(2)
+        validate_only = col_check.button("Validate Only")
+        run_import = col_import.button("Import", type="primary")
+        if upload is not None and (validate_only or run_import):
+            report = import_kb(upload.getvalue().decode("utf-8-sig"), detect_format(upload.name), KNOWLEDGE_BASE,
+                               KNOWLEDGE_BASE_PATH, replace=replace_existing, skip_invalid=skip_invalid,
+                               dry_run=validate_only, on_commit=apply_kb_bulk_change)
+            if report["errors"]:
+                st.error(f"{len(report['errors'])} of {report['rows']} rows have problems.")
+                st.dataframe(pd.DataFrame(report["errors"], columns=["Row", "Name", "Problem"]), use_container_width=True)
+            if report["written"]:
+                st.success(f"Imported {report['imported']} entries ({report['replaced']} replaced).")
+            elif validate_only and not report["errors"]:
+                st.success(f"All {report['rows']} rows are valid ({report['imported']} new or replaced entries).")
+            elif not report["errors"]:
+                st.info("Nothing to import.")
+
+
+# ----------------------------------------------------
+# TAB 3: USER ANALYTICS 
+# ----------------------------------------------------
+@st.fragment
+def render_admin_users():
+    st.header("Registered User Analytics")
+    user_data = get_all_users()
+
+    if user_data:
+        df = pd.DataFrame(user_data, columns=['Username', 'Email', 'Full Name', 'Age', 'Gender', 'Language', 'Created At'])
+
+        st.subheader("User Table")
+        st.dataframe(df, use_container_width=True)
 
         st.markdown("---")
-        chart_col1, chart_col2 = st.columns(2)
-
-        # CHART 1: QUERY TRENDS OVER TIME
-        with chart_col1:
-            st.subheader("Query Trends Over Time")
-            if not chat_df.empty and 'timestamp' in chat_df.columns:
-                chat_df['timestamp'] = pd.to_datetime(chat_df['timestamp'])
-                query_counts = chat_df.set_index('timestamp').resample('D').size().rename("Queries")
-                fig = px.line(query_counts.reset_index(), x='timestamp', y='Queries', title="Queries per Day")
-                st.plotly_chart(fig, use_container_width=True)
-            else: st.info("No sufficient chat history data to plot query trends.")
-
-        # CHART 2: TOP QUERY CATEGORIES
-        with chart_col2:
-            st.subheader("Top Query Categories")
-            if not chat_df.empty and 'detected_intent' in chat_df.columns:
-                intent_counts = chat_df['detected_intent'].value_counts().reset_index()
-                intent_counts.columns = ['Intent', 'Count']
-                fig = px.pie(intent_counts, values='Count', names='Intent', title='Distribution of Query Intents', hole=.3)
-                st.plotly_chart(fig, use_container_width=True)
-            else: st.info("No intent data available for Top Query Categories chart.")
-                
-        st.markdown("---")
-        
-        st.subheader("Recent Feedback")
-        if all_feedback:
-            feedback_df = pd.DataFrame(all_feedback, columns=['ID', 'Username', 'Query', 'Reply', 'Positive', 'Comment', 'Timestamp'])
-            feedback_df['Positive'] = feedback_df['Positive'].apply(lambda x: '👍 Positive' if x == 1 else '👎 Negative')
-            st.dataframe(feedback_df[['Timestamp', 'Username', 'Query', 'Positive', 'Comment']].head(5), use_container_width=True)
-        else: st.info("No feedback yet.")
-
-
-    # ----------------------------------------------------
-    # TAB 2: KNOWLEDGE BASE MANAGEMENT 
-    # ----------------------------------------------------
-    with tab2:
-        st.header("Knowledge Base (KB) Management")
-        
-        kb_tab1, kb_tab2, kb_tab3 = st.tabs(["View/Edit Entries", "Add New Entry", "Delete Entry"])
-        
-        # VIEW / EDIT
-        with kb_tab1:
-            st.subheader("View and Edit Existing Entries")
-            kb_names = list(KNOWLEDGE_BASE.keys())
-            if not kb_names:
-                st.warning("The knowledge base is empty.")
-            else:
-                selected_name = st.selectbox("Select Entry to View/Edit:", kb_names)
-                entry = KNOWLEDGE_BASE.get(selected_name, {})
-                
-                with st.form(f"edit_form_{selected_name}", clear_on_submit=False):
-                    new_description = st.text_area("Description (English)", entry.get('description', ''))
-                    new_symptoms = st.text_area("Symptoms (Comma Separated, English)", ", ".join(entry.get('symptoms', [])))
-                    new_treatment = st.text_area("Treatment/Tips (Comma Separated, English)", ", ".join(entry.get('treatment', [])))
-                    
-                    if st.form_submit_button("Save Changes"):
-                        new_data = {'description': new_description, 'symptoms': new_symptoms, 'treatment': new_treatment}
-                        if update_kb_entry(selected_name, new_data):
-                            st.success(f"Entry '{selected_name}' updated successfully!")
-                            st.rerun()
-                        else: st.error("Failed to update entry.")
-        
-        # ADD NEW
-        with kb_tab2:
-            st.subheader("Add a New Knowledge Base Entry")
-            with st.form("add_new_form", clear_on_submit=True):
-                new_name = st.text_input("New Entry Name (e.g., Dengue Fever)")
-                new_description = st.text_area("Description (English)")
-                new_symptoms = st.text_area("Symptoms (Comma Separated, English)")
-                new_treatment = st.text_area("Treatment/Tips (Comma Separated, English)")
-                
-                if st.form_submit_button("Add New Entry"):
-                    if new_name and new_description and new_symptoms and new_treatment:
-                        if add_kb_entry(new_name, new_description, new_symptoms, new_treatment):
-                            st.success(f"New entry '{new_name}' added successfully! Reloading...")
-                            st.rerun()
-                        # Error handled in add_kb_entry function
-                    else: st.error("Please fill in all fields.")
-
-        # DELETE
-        with kb_tab3:
-            st.subheader("Delete Knowledge Base Entry")
-            kb_names = list(KNOWLEDGE_BASE.keys())
-            if kb_names:
-                delete_name = st.selectbox("Select Entry to Delete:", kb_names, key="delete_kb_select")
-                if st.button(f"Permanently Delete '{delete_name}'", type="primary"):
-                    if delete_kb_entry(delete_name):
-                        st.success(f"Entry '{delete_name}' deleted successfully! Reloading...")
-                        st.rerun()
-                    else: st.error("Failed to delete entry.")
-            else:
-                st.info("No entries available to delete.")
-
-
-    # ----------------------------------------------------
-    # TAB 3: USER ANALYTICS 
-    # ----------------------------------------------------
-    with tab3:
-        st.header("Registered User Analytics")
-        user_data = get_all_users()
-        
-        if user_data:
-            df = pd.DataFrame(user_data, columns=['Username', 'Email', 'Full Name', 'Age', 'Gender', 'Language', 'Created At'])
-            
-            st.subheader("User Table")
-            st.dataframe(df, use_container_width=True)
 
-            st.markdown("---")
+        col_chart1, col_chart2 = st.columns(2)
+
+        # Chart 1: Gender Distribution
+        with col_chart1:
+            st.subheader("Gender Distribution")
+            gender_counts = df['Gender'].value_counts().reset_index()
+            gender_counts.columns = ['Gender', 'Count']
+            fig_gender = px.pie(gender_counts, values='Count', names='Gender', title='Registered User Gender Split', hole=.3)
+            st.plotly_chart(fig_gender, use_container_width=True)
+
+        # Chart 2: Language Preference
+        with col_chart2:
+            st.subheader("Language Preference")
+            lang_counts = df['Language'].value_counts().reset_index()
+            lang_counts.columns = ['Language', 'Count']
+            fig_lang = px.bar(lang_counts, x='Language', y='Count', title='Primary Language Preference')
+            st.plotly_chart(fig_lang, use_container_width=True)
+
+    else:
+        st.info("No user data available for analytics.")
+
+
+# ----------------------------------------------------
+# TAB 4: CHAT HISTORY (ALL USERS) 
+# ----------------------------------------------------
+@st.fragment
+def render_admin_chats():
+    st.header("All User Chat History")
+    all_chat_data = get_all_chats()
+    if all_chat_data:
+        df = pd.DataFrame(all_chat_data)
+        df = df[['timestamp', 'username', 'user_message', 'bot_reply', 'detected_intent']]
+        df.columns = ['Timestamp', 'Username', 'User Message', 'Bot Reply', 'Intent']
+        st.dataframe(df, use_container_width=True)
+    else:
+        st.info("No chat history recorded in the database.")
+
+
+# ----------------------------------------------------
+# TAB 5: FEEDBACK DATA
+# ----------------------------------------------------
+@st.fragment
+def render_admin_feedback():
+    st.header("User Feedback Log")
+    feedback_data = get_all_feedback_data()
+    if feedback_data:
+        df = pd.DataFrame(feedback_data, columns=['ID', 'Username', 'User Query', 'Bot Reply', 'Is Positive', 'Comment', 'Timestamp'])
+        df['Is Positive'] = df['Is Positive'].apply(lambda x: '👍 Positive' if x == 1 else '👎 Negative')
+        st.dataframe(df, use_container_width=True)
+    else:
+        st.info("No feedback has been submitted yet.")
+
+
+# ----------------------------------------------------
+# TAB 6: DB PERFORMANCE (query timings for this process)
+# ----------------------------------------------------
+@st.fragment
+def render_admin_db_performance():
+    st.header("Database Query Performance")
+    counters = get_counters()
+    dcol1, dcol2, dcol3, dcol4 = st.columns(4)
+    dcol1.metric("Queries", counters["queries"]); dcol2.metric(f"Slow (≥ {SLOW_QUERY_MS:g} ms)", counters["slow"])
+    dcol3.metric("Lock Retries", counters["lock_retries"]); dcol4.metric("Lock Errors", counters["lock_errors"])
+
+    st.subheader("Statements by Total Time")
+    query_stats = get_query_stats()
+    if query_stats:
+        df = pd.DataFrame(query_stats)[['db', 'sql', 'calls', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'lock_retries', 'errors']]
+        df.columns = ['Database', 'Query', 'Calls', 'Total ms', 'Avg ms', 'Max ms', 'Rows', 'Lock Retries', 'Errors']
+        st.dataframe(df.round(2), use_container_width=True)
+    else: st.info("No queries recorded yet.")
+
+    st.subheader("Slow Query Log")
+    st.caption(f"Also written as JSON lines to {QUERY_LOG_PATH}")
+    slow_queries = get_slow_queries()
+    if slow_queries:
+        df = pd.DataFrame(slow_queries)
+        if 'plan' in df.columns: df['plan'] = df['plan'].apply(lambda p: " | ".join(p) if isinstance(p, list) else "")
+        st.dataframe(df, use_container_width=True)
+    else: st.info("No slow or retried queries recorded.")
+
 
-            col_chart1, col_chart2 = st.columns(2)
-            
-            # Chart 1: Gender Distribution
-            with col_chart1:
-                st.subheader("Gender Distribution")
-                gender_counts = df['Gender'].value_counts().reset_index()
-                gender_counts.columns = ['Gender', 'Count']
-                fig_gender = px.pie(gender_counts, values='Count', names='Gender', title='Registered User Gender Split', hole=.3)
-                st.plotly_chart(fig_gender, use_container_width=True)
-                
-            # Chart 2: Language Preference
-            with col_chart2:
-                st.subheader("Language Preference")
-                lang_counts = df['Language'].value_counts().reset_index()
-                lang_counts.columns = ['Language', 'Count']
-                fig_lang = px.bar(lang_counts, x='Language', y='Count', title='Primary Language Preference')
-                st.plotly_chart(fig_lang, use_container_width=True)
-                
-        else:
-            st.info("No user data available for analytics.")
-
-
-    # ----------------------------------------------------
-    # TAB 4: CHAT HISTORY (ALL USERS) 
-    # ----------------------------------------------------
-    with tab4:
-        st.header("All User Chat History")
-        all_chat_data = get_all_chats()
-        if all_chat_data:
-            df = pd.DataFrame(all_chat_data)
-            df = df[['timestamp', 'username', 'user_message', 'bot_reply', 'detected_intent']]
-            df.columns = ['Timestamp', 'Username', 'User Message', 'Bot Reply', 'Intent']
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No chat history recorded in the database.")
-
-
-    # ----------------------------------------------------
-    # TAB 5: FEEDBACK DATA
-    # ----------------------------------------------------
-    with tab5:
-        st.header("User Feedback Log")
-        feedback_data = get_all_feedback_data()
-        if feedback_data:
-            df = pd.DataFrame(feedback_data, columns=['ID', 'Username', 'User Query', 'Bot Reply', 'Is Positive', 'Comment', 'Timestamp'])
-            df['Is Positive'] = df['Is Positive'].apply(lambda x: '👍 Positive' if x == 1 else '👎 Negative')
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.info("No feedback has been submitted yet.")
+ADMIN_TABS = {"Dashboard": render_admin_dashboard, "Knowledge Base": render_admin_kb, "User Analytics": render_admin_users, "Chat History": render_admin_chats, "Feedback": render_admin_feedback, "DB Performance": render_admin_db_performance}
 
 # ==============================================================================
 # MAIN APP LOGIC
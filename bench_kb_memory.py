@@ -0,0 +1,109 @@
+"""Memory benchmark: nested-dict KB structures vs the compact KB model.
+
+"dicts" reproduces what a process held before the compact model: the KB
+parsed once for app.py, once more for dialogue_manager, the symptom -> set
+of illness names index, and the question selector's per-language
+dict-of-sets indexes. "compact" is one KBModel with its adjacency built
+plus a QuestionSelector indexed for all three languages on top of it.
+Both start from the same synthetic knowledge_base.json text and are
+measured with tracemalloc after temporaries are freed.
+
+    python bench_kb_memory.py --sizes 1000 10000
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from kb_model import KBModel, SYMPTOM_FIELDS
+from question_selector import QuestionSelector
+
+LANGUAGES = ("English", "Hindi", "Telugu")
+WORDS = ("pain fever cough fatigue rest fluids doctor consult severe mild chronic acute infection "
+         "inflammation breathing chest throat skin rash nausea dizziness headache sleep water "
+         "medicine tablet hydration diet exercise stress blood pressure sugar heart lungs").split()
+
+
+def synthetic_kb_json(n, seed):
+    rng = random.Random(seed)
+    vocab = {field: [f"{rng.choice(WORDS)} {field[-2:]}{i}" for i in range(max(200, n // 2))]
+             for field in SYMPTOM_FIELDS}
+
+    def sentence(k):
+        return " ".join(rng.choice(WORDS) for _ in range(k))
+
+    kb = {}
+    for i in range(n):
+        entry = {}
+        for suffix in ("", "_hi", "_te"):
+            entry["symptoms" + suffix] = rng.sample(vocab["symptoms" + suffix], rng.randint(4, 8))
+            entry["description" + suffix] = sentence(15)
+            entry["treatment" + suffix] = [sentence(10) for _ in range(3)]
+            entry["warning" + suffix] = sentence(12)
+        kb[f"Illness {i}"] = entry
+    return json.dumps(kb, ensure_ascii=False)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return current, peak
+
+
+def build_dicts(text):
+    app_kb = json.loads(text)
+    dialogue_kb = json.loads(text)
+    index = {}
+    for illness, info in dialogue_kb.items():
+        for field in SYMPTOM_FIELDS:
+            for sym in info.get(field, []):
+                index.setdefault(sym.lower(), set()).add(illness)
+    # The question selector before it moved onto KBModel ids: per language,
+    # symptom -> illness names, illness -> symptoms and a ranking
+    selector = {}
+    for field in SYMPTOM_FIELDS:
+        symptom_to_illnesses, illness_to_symptoms = {}, {}
+        for illness, info in dialogue_kb.items():
+            syms = {s.lower() for s in info.get(field, [])}
+            illness_to_symptoms[illness] = syms
+            for sym in syms:
+                symptom_to_illnesses.setdefault(sym, set()).add(illness)
+        ranked = sorted(symptom_to_illnesses, key=lambda s: (-len(symptom_to_illnesses[s]), s))
+        selector[field] = (symptom_to_illnesses, illness_to_symptoms, ranked)
+    return app_kb, dialogue_kb, index, selector
+
+
+def build_compact(text):
+    model = KBModel(json.loads(text))
+    model.match_counts([])  # builds the adjacency
+    model.illness_ids_for(model.symptom_names[0])
+    selector = QuestionSelector(model)
+    for language in LANGUAGES:
+        selector.language_symptoms(language)
+    return model, selector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'illnesses':>10}  {'dicts MB':>9}  {'compact MB':>10}  {'saved':>6}  {'compact peak MB':>15}")
+    for n in args.sizes:
+        text = synthetic_kb_json(n, args.seed)
+        old, _ = measure(lambda: build_dicts(text))
+        new, new_peak = measure(lambda: build_compact(text))
+        print(f"{n:>10}  {old / 2**20:>9.2f}  {new / 2**20:>10.2f}  {100.0 * (1 - new / old):>5.1f}%  "
+              f"{new_peak / 2**20:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Latency benchmark for KB retrieval on a synthetic knowledge base.
+
+Entries are generated from the vocabulary of the bundled knowledge base, so
+term statistics look like real data at a larger scale.
+
+    python bench_retrieval.py --entries 10000 --queries 1000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from kb_retrieval import KBRetriever, TEXT_FIELDS
+from text_analysis import tokenize
+
+KB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json")
+
+
+def synthetic_kb(n, seed):
+    with open(KB_PATH, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    vocab = {field: [] for field in TEXT_FIELDS}
+    for info in base.values():
+        for field in TEXT_FIELDS:
+            value = info.get(field)
+            text = " ".join(value) if isinstance(value, list) else (value or "")
+            vocab[field].extend(tokenize(text))
+    rng = random.Random(seed)
+    kb = {}
+    for i in range(n):
+        entry = {}
+        for field, words in vocab.items():
+            if not words:
+                continue
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 20)))
+            entry[field] = [sentence] if field.startswith(("treatment", "tips", "names")) else sentence
+        kb[f"condition{i}"] = entry
+    return kb
+
+
+def ms(values):
+    ordered = sorted(values)
+    return (1000.0 * statistics.median(ordered),
+            1000.0 * ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    kb = synthetic_kb(args.entries, args.seed)
+    rng = random.Random(args.seed + 1)
+    names = list(kb)
+
+    start = time.perf_counter()
+    retriever = KBRetriever(kb)
+    build = time.perf_counter() - start
+
+    queries = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        words = tokenize(kb[name]["description"])
+        queries.append("what is " + " ".join(rng.sample(words, min(3, len(words)))))
+
+    latencies, hits = [], 0
+    for query in queries:
+        t = time.perf_counter()
+        results = retriever.search(query, k=3)
+        latencies.append(time.perf_counter() - t)
+        hits += bool(results)
+    query_p50, query_p99 = ms(latencies)
+
+    update_latencies = []
+    for name in rng.sample(names, min(args.updates, len(names))):
+        info = dict(kb[name], description=kb[name]["description"] + " updated")
+        t = time.perf_counter()
+        retriever.update(name, info)
+        update_latencies.append(time.perf_counter() - t)
+    update_p50, update_p99 = ms(update_latencies)
+
+    after = []
+    for query in queries[:200]:
+        t = time.perf_counter()
+        retriever.search(query, k=3)
+        after.append(time.perf_counter() - t)
+    after_p50, after_p99 = ms(after)
+
+    print(f"entries              {len(retriever)}")
+    print(f"build                {1000.0 * build:.1f} ms")
+    print(f"query p50/p99        {query_p50:.3f} / {query_p99:.3f} ms  ({hits}/{len(queries)} with results)")
+    print(f"update p50/p99       {update_p50:.3f} / {update_p99:.3f} ms")
+    print(f"query after updates  {after_p50:.3f} / {after_p99:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+# --- Settings ---
+DATA_DIR = os.environ.get("WELLBOT_DATA_DIR", os.path.dirname(__file__))
+# Statements slower than this are written to the slow-query log with their plan
+SLOW_QUERY_MS = float(os.environ.get("WELLBOT_SLOW_QUERY_MS", 100))
+QUERY_LOG_PATH = os.environ.get("WELLBOT_QUERY_LOG", os.path.join(DATA_DIR, "query_log.jsonl"))
+# 'database is locked' errors are retried this many times with a growing delay
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.05
+RECENT_SLOW_QUERIES = 200
+
+_PLANNABLE = ("select", "insert", "update", "delete", "with", "replace")
+_WHITESPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_stats = {}                                   # (db, sql) -> aggregate dict
+_slow = deque(maxlen=RECENT_SLOW_QUERIES)
+_counters = {"queries": 0, "slow": 0, "lock_retries": 0, "lock_errors": 0}
+
+
+def _is_locked(error):
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+
+def _with_lock_retries(call, *args):
+    """Run call, retrying 'database is locked' errors. Returns (result, retries).
+
+    An error that escapes carries the retries made before it as lock_retries.
+    """
+    retries = 0
+    while True:
+        try:
+            return call(*args), retries
+        except sqlite3.Error as e:
+            e.lock_retries = retries
+            if not _is_locked(e):
+                raise
+            if retries >= LOCK_RETRIES:
+                with _lock:
+                    _counters["lock_errors"] += 1
+                raise
+            retries += 1
+            with _lock:
+                _counters["lock_retries"] += 1
+            time.sleep(LOCK_RETRY_DELAY * retries)
+
+
+def _explain(connection, sql, parameters):
+    if not sql.lstrip().lower().startswith(_PLANNABLE):
+        return None
+    try:
+        # A plain cursor, so the plan lookup is not itself recorded
+        cursor = sqlite3.Cursor(connection)
+        rows = cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        cursor.close()
+        return [row[-1] for row in rows]
+    except sqlite3.Error:
+        return None
+
+
+def _write_log(entry):
+    try:
+        with open(QUERY_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"Warning: Could not write query log: {e}")
+
+
+def _record(db, sql, ms, rows, retries, connection=None, parameters=(), error=None):
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    slow = ms >= SLOW_QUERY_MS
+    plan = _explain(connection, sql, parameters) if slow and connection is not None else None
+    with _lock:
+        _counters["queries"] += 1
+        agg = _stats.get((db, sql))
+        if agg is None:
+            agg = _stats[(db, sql)] = {"db": db, "sql": sql, "calls": 0, "total_ms": 0.0,
+                                       "max_ms": 0.0, "rows": 0, "lock_retries": 0, "errors": 0}
+        agg["calls"] += 1
+        agg["total_ms"] += ms
+        agg["max_ms"] = max(agg["max_ms"], ms)
+        agg["rows"] += rows
+        agg["lock_retries"] += retries
+        agg["errors"] += error is not None
+        if slow:
+            _counters["slow"] += 1
+    if slow or retries or error:
+        entry = {"timestamp": datetime.now().isoformat(timespec="milliseconds"), "db": db, "sql": sql,
+                 "ms": round(ms, 3), "rows": rows, "lock_retries": retries, "slow": slow}
+        if plan:
+            entry["plan"] = plan
+        if error:
+            entry["error"] = error
+        with _lock:
+            _slow.append(entry)
+        _write_log(entry)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times each statement from execute until its rows have been read."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            sql, parameters, ms, rows, retries = pending
+            _record(self.connection.db_name, sql, ms, rows, retries, self.connection, parameters)
+
+    def _run(self, method, sql, parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            _, retries = _with_lock_retries(method, sql, parameters)
+        except sqlite3.Error as e:
+            _record(self.connection.db_name, sql, 1000.0 * (time.perf_counter() - start), 0,
+                    getattr(e, "lock_retries", 0), error=str(e))
+            raise
+        ms = 1000.0 * (time.perf_counter() - start)
+        if self.description is None:
+            # No result set: the statement is complete
+            _record(self.connection.db_name, sql, ms, max(self.rowcount, 0), retries,
+                    self.connection, parameters if method.__name__ == "execute" else ())
+        else:
+            self._pending = [sql, parameters, ms, 0, retries]
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._pending:
+            self._pending[2] += 1000.0 * (time.perf_counter() - start)
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if self._pending:
+            if row is None:
+                self._finish()
+            else:
+                self._pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, size or self.arraysize)
+        if self._pending:
+            self._pending[3] += len(rows)
+            if len(rows) < (size or self.arraysize):
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._pending:
+            self._pending[3] += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.db_name = os.path.basename(str(database))
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        if isinstance(cursor, InstrumentedCursor):
+            self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            _, retries = _with_lock_retries(super().commit)
+        except sqlite3.Error as e:
+            _record(self.db_name, "COMMIT", 1000.0 * (time.perf_counter() - start), 0,
+                    getattr(e, "lock_retries", 0), error=str(e))
+            raise
+        _record(self.db_name, "COMMIT", 1000.0 * (time.perf_counter() - start), 0, retries)
+
+    def close(self):
+        for cursor in list(self._cursors):
+            cursor._finish()
+        super().close()
+
+
+def connect(database, **kwargs):
+    """sqlite3.connect with every statement timed and logged."""
+    kwargs.setdefault("factory", InstrumentedConnection)
+    return sqlite3.connect(database, **kwargs)
+
+
+# --- Reporting ---
+def get_query_stats():
+    """Per-statement aggregates, slowest total time first."""
+    with _lock:
+        rows = [dict(agg) for agg in _stats.values()]
+    for row in rows:
+        row["avg_ms"] = row["total_ms"] / row["calls"] if row["calls"] else 0.0
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
+def get_slow_queries():
+    """Recent slow, retried or failed statements, newest first."""
+    with _lock:
+        return list(reversed(_slow))
+
+
+def get_counters():
+    with _lock:
+        return dict(_counters)
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+        for key in _counters:
+            _counters[key] = 0
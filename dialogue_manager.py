@@ -2,202 +2,446 @@ import random
 import re
 import json
 import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Dict, Tuple
 
+from language_packs import get_pack
+from kb_model import KBModel, get_shared_kb
+from question_selector import QuestionSelector
+from text_analysis import MessageAnalysis, analyze_message, tokenize
+
 # Import from knowledge_base - FIXED to avoid circular imports
 try:
-    from knowledge_base import load_kb, format_health_info
+    from knowledge_base import format_health_info
 except ImportError as e:
     # Fallback definitions
-    def load_kb(): return {}
     def format_health_info(info, topic=None, illness=None, language="English"): 
         return "Information not available"
     print(f"Warning: Could not import from knowledge_base: {e}")
 
+# KB question answering needs NumPy; without it those questions fall through
+try:
+    from kb_retrieval import KBRetriever
+except ImportError as e:
+    KBRetriever = None
+    print(f"Warning: KB retrieval disabled: {e}")
+
 # ✅ ADD SESSIONS FILE PATH
-SESSIONS_FILE = os.path.join(os.path.dirname(__file__), "user_sessions.json")
+SESSIONS_FILE = os.path.join(os.environ.get("WELLBOT_DATA_DIR", os.path.dirname(__file__)), "user_sessions.json")
 
-# Load knowledge base
+# Session lifetime: idle sessions expire after SESSION_TTL_SECONDS, and once
+# more than MAX_SESSIONS are live the least recently used ones are evicted
+SESSION_TTL_SECONDS = float(os.environ.get("WELLBOT_SESSION_TTL", 30 * 60))
+MAX_SESSIONS = int(os.environ.get("WELLBOT_MAX_SESSIONS", 10000))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("WELLBOT_SESSION_SWEEP_INTERVAL", 60))
+
+# Load knowledge base - one shared model per process, also used by app.py.
+# It holds the symptom -> illness index for all languages.
 try:
-    KB = load_kb()
+    KB = get_shared_kb()
 except Exception as e:
     print(f"Warning: Could not load knowledge base: {e}")
-    KB = {}
-
-# ✅ IMPROVED SYMPTOM MAPPING - includes all languages
-SYMPTOM_TO_ILLNESSES = {}
-
-# Build comprehensive symptom mapping from all languages
-for illness, info in KB.items():
-    # English symptoms
-    for sym in info.get("symptoms", []):
-        SYMPTOM_TO_ILLNESSES.setdefault(sym.lower(), set()).add(illness)
-    
-    # Hindi symptoms
-    for sym in info.get("symptoms_hi", []):
-        SYMPTOM_TO_ILLNESSES.setdefault(sym.lower(), set()).add(illness)
-    
-    # Telugu symptoms
-    for sym in info.get("symptoms_te", []):
-        SYMPTOM_TO_ILLNESSES.setdefault(sym.lower(), set()).add(illness)
+    KB = KBModel()
+
+# Symptom token sequence -> symptom, for matching against message tokens
+SYMPTOM_PHRASES = {}
+MAX_SYMPTOM_WORDS = 0
+# Illness name token sequence -> KB entry, from the English key and the
+# names_hi/names_te fields (("sinus", "infection") -> "Sinus infection")
+ILLNESS_PHRASES = {}
+MAX_ILLNESS_WORDS = 0
+
+def rebuild_symptom_index():
+    """Rebuild SYMPTOM_PHRASES and ILLNESS_PHRASES from the KB."""
+    global MAX_SYMPTOM_WORDS, MAX_ILLNESS_WORDS
+    SYMPTOM_PHRASES.clear()
+    for sym in KB.symptom_vocabulary():
+        phrase = tokenize(sym)
+        if phrase:
+            SYMPTOM_PHRASES.setdefault(phrase, sym)
+    MAX_SYMPTOM_WORDS = max((len(p) for p in SYMPTOM_PHRASES), default=0)
+    ILLNESS_PHRASES.clear()
+    for name in KB:
+        info = KB[name]
+        # "dengue,cold" style keys name several illnesses
+        aliases = name.split(",") + info.get("names_hi", []) + info.get("names_te", [])
+        for alias in aliases:
+            phrase = tokenize(alias)
+            if phrase:
+                ILLNESS_PHRASES.setdefault(phrase, name)
+    MAX_ILLNESS_WORDS = max((len(p) for p in ILLNESS_PHRASES), default=0)
+
+rebuild_symptom_index()
+
+# Follow-up questions: "info_gain" asks about the symptom that best splits the
+# likely illnesses, "random" asks about any symptom in the vocabulary
+QUESTION_STRATEGY = "info_gain"
+QUESTION_SELECTOR = QuestionSelector(KB)
+
+# Free-text questions about KB entries ("what is dengue")
+KB_RETRIEVER = KBRetriever(KB) if KBRetriever else None
+MIN_RETRIEVAL_SCORE = 1.0
+
+def apply_kb_change(name: str, info: dict = None):
+    """Bring the dialogue indexes up to date after one KB entry changed.
+
+    Pass info=None when the entry was deleted.
+    """
+    if info is None:
+        KB.pop(name, None)
+        if KB_RETRIEVER:
+            KB_RETRIEVER.remove(name)
+    else:
+        KB[name] = info
+        if KB_RETRIEVER:
+            KB_RETRIEVER.update(name, info)
+    rebuild_symptom_index()
+    QUESTION_SELECTOR.invalidate()
+
+def apply_kb_bulk_change(entries: Dict[str, dict]):
+    """Add or replace many KB entries, then rebuild every derived index once."""
+    KB.load(entries)
+    if KB_RETRIEVER:
+        KB_RETRIEVER.rebuild(KB)
+    rebuild_symptom_index()
+    QUESTION_SELECTOR.invalidate()
+
+RETRIEVAL_CANDIDATES = 5
+
+def illnesses_named_in(words: Tuple[str, ...]) -> set:
+    """KB entries whose full name, in any language, appears in the words."""
+    named = set()
+    for i in range(len(words)):
+        for n in range(1, min(MAX_ILLNESS_WORDS, len(words) - i) + 1):
+            name = ILLNESS_PHRASES.get(words[i:i + n])
+            if name:
+                named.add(name)
+    return named
+
+def answer_kb_question(question: str, language: str = "English", analysis: MessageAnalysis = None) -> str:
+    """Answer a question about a KB entry, or return None if nothing matches.
+
+    Only entries whose whole name appears in the question qualify ("ear
+    infection" does not name "Sinus infection"): answering about the wrong
+    illness is worse than not answering. Retrieval ranks them when several do.
+    """
+    if not KB_RETRIEVER:
+        return None
+    words = (analysis or analyze_message(question)).words
+    named = illnesses_named_in(words)
+    if not named:
+        return None
+    for name, score in KB_RETRIEVER.search_tokens(words, k=RETRIEVAL_CANDIDATES):
+        if score < MIN_RETRIEVAL_SCORE:
+            break
+        if name in named:
+            return format_health_info(KB.get(name, {}), illness=name, language=language)
+    return None
 
 # ✅ LANGUAGE DETECTION FUNCTION
-def detect_input_language(text):
+def detect_input_language(text, analysis: MessageAnalysis = None):
     """
     Detect the language of user input based on character patterns
     """
-    # Hindi character range
-    hindi_pattern = re.compile(r'[\u0900-\u097F]')
-    # Telugu character range  
-    telugu_pattern = re.compile(r'[\u0C00-\u0C7F]')
-    
-    if hindi_pattern.search(text):
-        return 'Hindi'
-    elif telugu_pattern.search(text):
-        return 'Telugu'
-    else:
-        return 'English'
+    return (analysis or analyze_message(text)).language
+
+# Guards user_sessions against the background sweeper
+SESSIONS_LOCK = threading.RLock()
+# Held from snapshot to rename, so an older snapshot never replaces a newer file
+_SAVE_LOCK = threading.Lock()
+SESSION_COUNTERS = {"expired": 0, "evicted": 0}
+_sweeper_thread = None
+
+def new_session() -> Dict:
+    now = time.time()
+    return {"symptoms": set(), "entities": {}, "asked": [], "denied": [], "pending": None,
+            "created": now, "touched": now}
+
+def _is_expired(session: Dict, now: float) -> bool:
+    return now - session.get("touched", now) > SESSION_TTL_SECONDS
+
+def _enforce_session_cap() -> int:
+    evicted = 0
+    while len(user_sessions) > MAX_SESSIONS:
+        user_sessions.popitem(last=False)
+        evicted += 1
+    SESSION_COUNTERS["evicted"] += evicted
+    return evicted
 
 # ✅ MODIFIED: Load sessions from JSON file instead of memory
 def load_sessions():
-    """Load user sessions from JSON file"""
+    """Load user sessions from JSON file, dropping ones that have expired"""
+    sessions = OrderedDict()
     if os.path.exists(SESSIONS_FILE):
         try:
             with open(SESSIONS_FILE, "r", encoding="utf-8") as f:
                 data = json.load(f)
+            now = time.time()
+            loaded = []
+            for user_id, session in data.items():
                 # Convert lists back to sets for symptoms
-                for user_id, session in data.items():
-                    if "symptoms" in session:
-                        session["symptoms"] = set(session["symptoms"])
-                return data
+                session["symptoms"] = set(session.get("symptoms", []))
+                session.setdefault("entities", {})
+                session.setdefault("asked", [])
+                session.setdefault("denied", [])
+                session.setdefault("pending", None)
+                # Files written before sessions had timestamps start their TTL now
+                session.setdefault("created", now)
+                session.setdefault("touched", now)
+                if _is_expired(session, now):
+                    SESSION_COUNTERS["expired"] += 1
+                    continue
+                loaded.append((user_id, session))
+            # Oldest first, so the LRU end of the dict is the least recently used
+            loaded.sort(key=lambda item: item[1]["touched"])
+            sessions.update(loaded)
         except Exception as e:
             print(f"Warning: Could not load sessions: {e}")
-            return {}
-    return {}
+    return sessions
 
 def save_sessions():
-    """Save user sessions to JSON file"""
+    """Save user sessions to JSON file.
+
+    The snapshot is copied under SESSIONS_LOCK, so other threads can keep
+    changing sessions while it is written. It goes to a temporary file that
+    is renamed over SESSIONS_FILE, so readers never see a half-written file.
+    """
+    tmp_path = None
     try:
-        # Convert sets to lists for JSON serialization
-        save_data = {}
-        for user_id, session in user_sessions.items():
-            save_data[user_id] = {
-                "symptoms": list(session["symptoms"]),
-                "entities": session["entities"]
-            }
-        with open(SESSIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(save_data, f, indent=2)
+        with _SAVE_LOCK:
+            # Copy every mutable field; sets become lists for JSON
+            save_data = {}
+            with SESSIONS_LOCK:
+                for user_id, session in user_sessions.items():
+                    save_data[user_id] = {
+                        "symptoms": list(session["symptoms"]),
+                        "entities": dict(session["entities"]),
+                        "asked": list(session.get("asked", [])),
+                        "denied": list(session.get("denied", [])),
+                        "pending": session.get("pending"),
+                        "created": session.get("created"),
+                        "touched": session.get("touched")
+                    }
+            directory = os.path.dirname(os.path.abspath(SESSIONS_FILE))
+            fd, tmp_path = tempfile.mkstemp(prefix=".user_sessions.", suffix=".json", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(save_data, f, indent=2)
+            os.replace(tmp_path, SESSIONS_FILE)
+            tmp_path = None
     except Exception as e:
         print(f"Warning: Could not save sessions: {e}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 # ✅ MODIFIED: Load sessions from file at startup
 user_sessions = load_sessions()
+with SESSIONS_LOCK:
+    _enforce_session_cap()
 
-# Conversation phrases with multilingual support
-GREETINGS = {
-    'English': ["Hello! How are you feeling today?", "Hi there! Tell me your symptoms.", "Hey! How can I help you today?"],
-    'Hindi': ["नमस्ते! आज आप कैसा महसूस कर रहे हैं?", "हाय! मुझे अपने लक्षण बताएं।", "नमस्ते! आज मैं आपकी कैसे मदद कर सकता हूं?"],
-    'Telugu': ["హలో! మీరు ఈరోజు ఎలా భావిస్తున్నారు?", "హాయ్! మీ లక్షణాలు చెప్పండి.", "హే! నేను ఈరోజు మీకు ఎలా సహాయపడగలను?"]
-}
+def get_session(user_id: str, create: bool = False) -> Dict:
+    """Return the live session for a user and mark it as recently used.
 
-GOODBYES = {
-    'English': ["Goodbye! Take care!", "See you soon — stay safe!", "Bye! Wishing you good health."],
-    'Hindi': ["अलविदा! अपना ख्याल रखना!", "जल्द मिलते हैं - सुरक्षित रहें!", "अलविदा! आपके अच्छे स्वास्थ्य की कामना करता हूं।"],
-    'Telugu': ["వీడ్కోలు! జాగ్రత్తగా ఉండండి!", "త్వరలో కలుద్దాం - సురక్షితంగా ఉండండి!", "బై! మీ మంచి ఆరోగ్యానికి శుభాకాంక్షలు."]
-}
+    A session idle for longer than SESSION_TTL_SECONDS is dropped here even if
+    the sweeper has not reached it yet. Returns None when there is no live
+    session and create is False.
+    """
+    with SESSIONS_LOCK:
+        now = time.time()
+        session = user_sessions.get(user_id)
+        if session is not None and _is_expired(session, now):
+            user_sessions.pop(user_id)
+            SESSION_COUNTERS["expired"] += 1
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session = user_sessions[user_id] = new_session()
+            _enforce_session_cap()
+        else:
+            user_sessions.move_to_end(user_id)
+        session["touched"] = now
+        return session
+
+def drop_session(user_id: str):
+    with SESSIONS_LOCK:
+        removed = user_sessions.pop(user_id, None) is not None
+    if removed:
+        save_sessions()
 
-MORE_SYMPTOMS = {
-    'English': ["Can you tell me more symptoms?", "Any other symptoms?", "What else do you feel?"],
-    'Hindi': ["क्या आप और लक्षण बता सकते हैं?", "कोई अन्य लक्षण?", "आप और क्या महसूस कर रहे हैं?"],
-    'Telugu': ["మీరు మరిన్ని లక్షణాలు చెప్పగలరా?", "ఇతర లక్షణాలు ఏమైనా ఉన్నాయా?", "మీరు మరేమి అనుభవిస్తున్నారు?"]
-}
+def sweep_sessions() -> int:
+    """Remove every expired session. Returns how many were removed."""
+    with SESSIONS_LOCK:
+        now = time.time()
+        expired = [uid for uid, sess in user_sessions.items() if _is_expired(sess, now)]
+        for uid in expired:
+            user_sessions.pop(uid)
+        SESSION_COUNTERS["expired"] += len(expired)
+    if expired:
+        save_sessions()
+    return len(expired)
 
-DISCLAIMER = {
-    'English': "Note: I'm not a medical professional. I can suggest possible conditions based on symptoms, but please consult a healthcare provider for a proper diagnosis.",
-    'Hindi': "नोट: मैं एक चिकित्सा पेशेवर नहीं हूं। मैं लक्षणों के आधार पर संभावित स्थितियों का सुझाव दे सकता हूं, लेकिन कृपया उचित निदान के लिए स्वास्थ्य सेवा प्रदाता से सलाह लें।",
-    'Telugu': "గమనిక: నేను వైద్య పరిజ్ఞానం కలిగిన వ్యక్తి కాదు. నేను లక్షణాల ఆధారంగా సంభావ్య పరిస్థితులను సూచించగలను, కానీ దయచేసి సరైన నిర్ధారణ కోసం హెల్త్కేర్ ప్రొవైడర్ను సంప్రదించండి."
+def _sweep_forever(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep_sessions()
+        except Exception as e:
+            print(f"Warning: Session sweep failed: {e}")
+
+def start_session_sweeper(interval: float = None):
+    """Start the background expiry thread once per process."""
+    global _sweeper_thread
+    with SESSIONS_LOCK:
+        if _sweeper_thread is None:
+            _sweeper_thread = threading.Thread(
+                target=_sweep_forever, args=(interval or SESSION_SWEEP_INTERVAL,),
+                name="session-sweeper", daemon=True)
+            _sweeper_thread.start()
+
+def get_session_stats() -> Dict[str, int]:
+    with SESSIONS_LOCK:
+        return {"live": len(user_sessions), **SESSION_COUNTERS}
+
+# Entity patterns, applied to the normalized text (Indic digits already ASCII)
+DURATION_PATTERNS = [
+    re.compile(r"\bfor\s+(\d+)\s+days?\b"),
+    re.compile(r"\bsince\s+(\d+)\s+days?\b"),
+    re.compile(r"(\d+)\s*दिन"),
+    re.compile(r"(\d+)\s*రోజు"),
+]
+SEVERITY_WORDS = {
+    "mild": "mild", "moderate": "moderate", "severe": "severe",
+    "हल्का": "mild", "हल्की": "mild", "मध्यम": "moderate", "गंभीर": "severe", "तेज": "severe", "तेज़": "severe",
+    "తేలికపాటి": "mild", "స్వల్ప": "mild", "మోస్తరు": "moderate", "తీవ్ర": "severe", "తీవ్రమైన": "severe",
 }
 
-# Regex patterns
-duration_pattern = re.compile(r"\bfor\s+(\d+)\s+days?\b")
-severity_pattern = re.compile(r"\b(mild|moderate|severe)\b")
-
 # --- Helper functions ---
-def extract_entities(text: str) -> Dict[str, str]:
+def extract_entities(text: str, analysis: MessageAnalysis = None) -> Dict[str, str]:
+    analysis = analysis or analyze_message(text)
     entities = {}
-    d = duration_pattern.search(text)
-    s = severity_pattern.search(text)
-    if d:
-        entities["duration"] = f"{d.group(1)} days"
-    if s:
-        entities["severity"] = s.group(1)
+    for pattern in DURATION_PATTERNS:
+        d = pattern.search(analysis.normalized)
+        if d:
+            entities["duration"] = f"{d.group(1)} days"
+            break
+    for word in analysis.words:
+        if word in SEVERITY_WORDS:
+            entities["severity"] = SEVERITY_WORDS[word]
+            break
     return entities
 
-def extract_symptoms(text: str) -> List[str]:
+def extract_symptoms(text: str, analysis: MessageAnalysis = None) -> List[str]:
+    """Find KB symptoms in the message, matching whole token sequences."""
+    words = (analysis or analyze_message(text)).words
     found = []
-    lower_text = text.lower().strip()
-    
-    # Check for exact matches and partial matches
-    for symptom in SYMPTOM_TO_ILLNESSES.keys():
-        symptom_lower = symptom.lower()
-        # Check for exact match or word boundary match
-        if (symptom_lower in lower_text and 
-            (symptom_lower == lower_text or 
-             f" {symptom_lower} " in f" {lower_text} " or
-             lower_text.startswith(symptom_lower + " ") or
-             lower_text.endswith(" " + symptom_lower))):
-            if symptom not in found:
+    for i in range(len(words)):
+        for n in range(min(MAX_SYMPTOM_WORDS, len(words) - i), 0, -1):
+            symptom = SYMPTOM_PHRASES.get(words[i:i + n])
+            if symptom and symptom not in found:
                 found.append(symptom)
-    
     return found
 
+def _merge_symptoms(user_id: str, symptoms: List[str], entities: Dict[str, str]) -> Dict:
+    with SESSIONS_LOCK:
+        session = get_session(user_id, create=True)
+        session["symptoms"].update(symptoms)
+        for k, v in entities.items():
+            if k not in session["entities"]:
+                session["entities"][k] = v
+        return session
+
 def add_symptoms(user_id: str, symptoms: List[str], entities: Dict[str, str]):
-    session = user_sessions.setdefault(user_id, {"symptoms": set(), "entities": {}})
-    for s in symptoms:
-        session["symptoms"].add(s)
-    for k, v in entities.items():
-        if k not in session["entities"]:
-            session["entities"][k] = v
+    _merge_symptoms(user_id, symptoms, entities)
     # ✅ ADDED: Save to file after updating
     save_sessions()
 
 def detect_possible_illnesses(symptoms: List[str]) -> List[Tuple[str, int]]:
-    matches = []
-    sym_set = set(s.lower() for s in symptoms)
-    for illness, info in KB.items():
-        # Check symptoms in all languages
-        all_symptoms = set()
-        for key in ['symptoms', 'symptoms_hi', 'symptoms_te']:
-            for symptom in info.get(key, []):
-                all_symptoms.add(symptom.lower())
-        
-        common = sym_set & all_symptoms
-        if len(common) > 0:
-            matches.append((illness, len(common)))
-    matches.sort(key=lambda x: x[1], reverse=True)
-    return matches
-
-def suggest_more_symptoms(current: List[str], language: str = "English") -> str:
-    all_syms = set(SYMPTOM_TO_ILLNESSES.keys())
+    # Symptoms in all languages, via the KB's symptom -> illness adjacency
+    return KB.match_counts(symptoms)
+
+def choose_follow_up_symptom(current: List[str], language: str = "English",
+                             asked: List[str] = (), denied: List[str] = ()) -> str:
+    if QUESTION_STRATEGY == "info_gain":
+        return QUESTION_SELECTOR.next_symptom(current, language, asked=asked, denied=denied)
+
+    all_syms = set(KB.symptom_vocabulary())
     remaining = list(all_syms - set(s.lower() for s in current))
     random.shuffle(remaining)
-    
-    if remaining:
-        symptom_suggestion = remaining[0]
-        if language == 'Hindi':
-            return f"क्या आपको {symptom_suggestion} भी है?"
-        elif language == 'Telugu':
-            return f"మీకు {symptom_suggestion} కూడా ఉందా?"
-        else:
-            return f"Do you also have {symptom_suggestion}?"
+    return remaining[0] if remaining else None
+
+def suggest_more_symptoms(current: List[str], language: str = "English",
+                          asked: List[str] = (), denied: List[str] = ()) -> str:
+    symptom = choose_follow_up_symptom(current, language, asked, denied)
+    if symptom:
+        return get_pack(language).render('ask_symptom', symptom=symptom)
     return ""
 
+# --- Answers to a follow-up question ---
+AFFIRMATIVE_WORDS = {"yes", "yeah", "yep", "yup", "haan", "han", "avunu", "हाँ", "हां", "जी", "అవును"}
+NEGATIVE_WORDS = {"no", "nope", "nah", "not", "nahi", "nahin", "ledu", "नहीं", "नही", "లేదు", "కాదు"}
+
+def classify_answer(text: str, analysis: MessageAnalysis = None) -> str:
+    words = (analysis or analyze_message(text)).word_set
+    if words & NEGATIVE_WORDS:
+        return "no"
+    if words & AFFIRMATIVE_WORDS:
+        return "yes"
+    return None
+
 # --- Rule-based intent detection ---
-def detect_rule_based_intent(msg: str) -> str:
-    m = msg.lower()
-    if any(w in m for w in ["hi", "hello", "hey", "namaste", "halo", "नमस्ते", "హలో"]):
+# Short greeting words must match whole tokens ("hi" is inside "chills")
+GREET_WORDS = {"hi", "hello", "hey", "namaste", "halo", "नमस्ते", "హలో"}
+GOODBYE_WORDS = {"bye", "goodbye", "alvida", "vīḍkōlu", "अलविदा", "వీడ్కోలు"}
+GOODBYE_PHRASES = [("see", "you")]
+KB_QUESTION_PHRASES = ["what is", "what's", "what are", "how to treat", "how do i treat", "treatment for",
+                       "tell me about", "क्या है", "क्या होता है", "इलाज", "అంటే ఏమిటి", "ఏమిటి", "చికిత్స"]
+KB_QUESTION_TOKENS = [tokenize(p) for p in KB_QUESTION_PHRASES]
+ARTICLE_WORDS = {"a", "an", "the"}
+# Case markers between a Hindi/Telugu name and the question ("माइग्रेन का इलाज")
+POSTPOSITION_WORDS = {"का", "की", "के", "కు", "కి"}
+
+def _illness_at(words: Tuple[str, ...], start: int, backwards: bool = False) -> bool:
+    """True if an illness name starts (or, backwards, ends) at words[start]."""
+    for n in range(1, MAX_ILLNESS_WORDS + 1):
+        span = words[start - n + 1:start + 1] if backwards else words[start:start + n]
+        if len(span) == n and span in ILLNESS_PHRASES:
+            return True
+    return False
+
+def asks_about_illness(analysis: MessageAnalysis) -> bool:
+    """True if a question phrase sits right next to an illness name.
+
+    English puts the name after the phrase ("what is dengue"); Hindi and
+    Telugu put it before ("डेंगू क्या है", "माइग्रेन का इलाज"), so both sides
+    are checked, skipping articles and postpositions.
+    """
+    words = analysis.words
+    for phrase in KB_QUESTION_TOKENS:
+        n = len(phrase)
+        for i in range(len(words) - n + 1):
+            if words[i:i + n] != phrase:
+                continue
+            after = i + n
+            while after < len(words) and words[after] in ARTICLE_WORDS:
+                after += 1
+            before = i - 1
+            while before >= 0 and words[before] in POSTPOSITION_WORDS:
+                before -= 1
+            if _illness_at(words, after) or (before >= 0 and _illness_at(words, before, backwards=True)):
+                return True
+    return False
+
+def detect_rule_based_intent(msg: str, analysis: MessageAnalysis = None) -> str:
+    analysis = analysis or analyze_message(msg)
+    m = analysis.normalized
+    words = analysis.word_set
+    if words & GREET_WORDS:
         return "greet"
-    if any(w in m for w in ["bye", "goodbye", "see you", "alvida", "vīḍkōlu", "अलविदा", "వీడ్కోలు"]):
+    if words & GOODBYE_WORDS or any(analysis.has_phrase(p) for p in GOODBYE_PHRASES):
         return "goodbye"
     if "stress" in m or "anxious" in m or "तनाव" in m or "ఒత్తిడి" in m:
         return "stress"
@@ -207,25 +451,33 @@ def detect_rule_based_intent(msg: str) -> str:
         return "exercise"
     if any(p in m for p in ["what do i have", "diagnose", "so what do i have", "मुझे क्या है", "నాకు ఏమి ఉంది"]):
         return "diagnosis_query"
+    # "what is wrong with me, I have fever" is a symptom report, not a KB question
+    if any(analysis.has_phrase(p) for p in KB_QUESTION_TOKENS):
+        if asks_about_illness(analysis) or not extract_symptoms(msg, analysis):
+            return "kb_question"
     return "unknown"
 
 # --- Main bot logic ---
 def get_bot_reply(user_id: str, user_message: str, intent: str = None, language: str = "English") -> str:
+    # Normalize and tokenize once; every stage below reads this analysis
+    analysis = analyze_message(user_message)
+
     # Auto-detect language from user message if not specified
     if language == "English":
-        language = detect_input_language(user_message)
+        language = detect_input_language(user_message, analysis)
     
     if intent is None:
-        intent = detect_rule_based_intent(user_message)
+        intent = detect_rule_based_intent(user_message, analysis)
+    pack = get_pack(language)
+    start_session_sweeper()
+    sess = get_session(user_id)
 
     # Greeting / Goodbye
     if intent == "greet":
-        return random.choice(GREETINGS.get(language, GREETINGS['English']))
+        return pack.choice('greetings')
     if intent == "goodbye":
-        if user_id in user_sessions:
-            user_sessions.pop(user_id)
-            save_sessions()
-        return random.choice(GOODBYES.get(language, GOODBYES['English']))
+        drop_session(user_id)
+        return pack.choice('goodbyes')
 
     # Wellness tips
     if intent in ["stress", "sleep", "exercise"]:
@@ -233,56 +485,70 @@ def get_bot_reply(user_id: str, user_message: str, intent: str = None, language:
 
     # Diagnosis query
     if intent == "diagnosis_query":
-        sess = user_sessions.get(user_id, {"symptoms": set()})
-        if not sess["symptoms"]:
-            if language == 'Hindi':
-                return "मेरे पास अभी तक पर्याप्त लक्षण नहीं हैं। कृपया मुझे बताएं कि आप क्या महसूस कर रहे हैं।"
-            elif language == 'Telugu':
-                return "నా వద్ద ఇంకా తగినంత లక్షణాలు లేవు. దయచేసి మీరు ఏమి అనుభవిస్తున్నారో చెప్పండి."
-            else:
-                return "I don't have enough symptoms yet. Please tell me what you're feeling."
+        if not sess or not sess["symptoms"]:
+            return pack.render('not_enough_symptoms')
         
         matches = detect_possible_illnesses(list(sess["symptoms"]))
         if not matches:
-            if language == 'Hindi':
-                return "मुझे सुझाव देने के लिए कुछ और लक्षण चाहिए।"
-            elif language == 'Telugu':
-                return "సూచించడానికి మరికొన్ని లక్షణాలు అవసరం."
-            else:
-                return "I need a few more symptoms to make a suggestion."
+            return pack.render('need_more_symptoms')
         return build_diagnosis_and_reset(user_id, matches, language)
 
-    # Symptom handling
-    new_syms = extract_symptoms(user_message)
-    ents = extract_entities(user_message)
-    if new_syms or ents:
-        add_symptoms(user_id, new_syms, ents)
+    # Questions about a KB entry; fall through to symptom handling if none fits
+    if intent == "kb_question":
+        answer = answer_kb_question(user_message, language, analysis)
+        if answer:
+            return answer
 
-    sess = user_sessions.get(user_id, {"symptoms": set()})
-    all_syms = list(sess["symptoms"])
+    # Symptom handling
+    new_syms = extract_symptoms(user_message, analysis)
+    ents = extract_entities(user_message, analysis)
+
+    # Session changes happen under the lock; the file is written once per turn
+    with SESSIONS_LOCK:
+        # Resolve the follow-up question asked on the previous turn
+        pending = sess.get("pending") if sess else None
+        if pending:
+            sess["pending"] = None
+            answer = classify_answer(user_message, analysis)
+            if pending not in new_syms:
+                if answer == "yes":
+                    new_syms.append(pending)
+                elif answer == "no":
+                    sess["denied"].append(pending)
+        if new_syms or ents:
+            sess = _merge_symptoms(user_id, new_syms, ents)
+        changed = bool(pending or new_syms or ents)
+        all_syms = list(sess["symptoms"]) if sess else []
+        asked = list(sess["asked"]) if sess else []
+        denied = list(sess["denied"]) if sess else []
 
     if len(all_syms) < 2:
-        return random.choice(MORE_SYMPTOMS.get(language, MORE_SYMPTOMS['English']))
-
-    matches = detect_possible_illnesses(all_syms)
-    if matches and matches[0][1] >= 2:
-        return build_diagnosis_and_reset(user_id, matches, language)
-
-    more_symptoms_msg = suggest_more_symptoms(all_syms, language)
-    if more_symptoms_msg:
-        return more_symptoms_msg
-
-    if language == 'Hindi':
-        return "मुझे थोड़ी और जानकारी चाहिए। " + random.choice(MORE_SYMPTOMS.get(language, MORE_SYMPTOMS['English']))
-    elif language == 'Telugu':
-        return "కొంచెం మరింత సమాచారం కావాలి. " + random.choice(MORE_SYMPTOMS.get(language, MORE_SYMPTOMS['English']))
+        reply = pack.choice('more_symptoms')
     else:
-        return "I need a bit more information. " + random.choice(MORE_SYMPTOMS.get(language, MORE_SYMPTOMS['English']))
+        matches = detect_possible_illnesses(all_syms)
+        if matches and matches[0][1] >= 2:
+            # Drops the session, which writes the file
+            return build_diagnosis_and_reset(user_id, matches, language)
+
+        follow_up = choose_follow_up_symptom(all_syms, language, asked, denied)
+        if follow_up:
+            with SESSIONS_LOCK:
+                sess["asked"].append(follow_up)
+                sess["pending"] = follow_up
+            changed = True
+            reply = pack.render('ask_symptom', symptom=follow_up)
+        else:
+            reply = pack.render('need_more_info', question=pack.choice('more_symptoms'))
+
+    if changed:
+        save_sessions()
+    return reply
 
 def build_diagnosis_and_reset(user_id: str, matches: List[Tuple[str, int]], language: str) -> str:
     top_matches = [m[0] for m in matches[:3]]
+    pack = get_pack(language)
     
-    parts = [DISCLAIMER.get(language, DISCLAIMER['English']), ""]
+    parts = [pack.render('disclaimer'), ""]
     
     for ill in top_matches:
         illness_info = KB.get(ill, {})
@@ -291,16 +557,9 @@ def build_diagnosis_and_reset(user_id: str, matches: List[Tuple[str, int]], lang
         parts.append("")
     
     # Add possible conditions summary
-    if language == 'Hindi':
-        parts.append(f"संभावित स्थितियां: {', '.join(top_matches)}")
-    elif language == 'Telugu':
-        parts.append(f"సాధ్యమయ్యే పరిస్థితులు: {', '.join(top_matches)}")
-    else:
-        parts.append(f"Possible conditions: {', '.join(top_matches)}")
+    parts.append(pack.render('possible_conditions', conditions=', '.join(top_matches)))
     
     # Clear session after diagnosis
-    if user_id in user_sessions:
-        user_sessions.pop(user_id)
-        save_sessions()
+    drop_session(user_id)
 
     return "\n".join(parts)
\ No newline at end of file
@@ -0,0 +1,226 @@
+import sys
+import threading
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterable, List, Tuple
+
+SYMPTOM_FIELDS = ("symptoms", "symptoms_hi", "symptoms_te")
+TEXT_FIELDS = ("description", "description_hi", "description_te",
+               "warning", "warning_hi", "warning_te")
+# names_hi/names_te: what the illness is called in Hindi/Telugu; the key is the English name
+LIST_FIELDS = ("treatment", "treatment_hi", "treatment_te", "tips", "names_hi", "names_te")
+FIELD_ORDER = ("symptoms", "description", "treatment", "warning",
+               "symptoms_hi", "description_hi", "treatment_hi", "warning_hi", "names_hi",
+               "symptoms_te", "description_te", "treatment_te", "warning_te", "names_te", "tips")
+
+
+class Illness(Mapping):
+    """One KB entry. Reads like the JSON dict it was built from.
+
+    Symptom fields are stored as arrays of symptom ids into the owning
+    model's interned vocabulary; list fields are tuples. Keys outside the
+    known schema are kept in extra.
+    """
+    __slots__ = ("id", "name", "_model",
+                 "symptoms", "symptoms_hi", "symptoms_te",
+                 "description", "description_hi", "description_te",
+                 "warning", "warning_hi", "warning_te",
+                 "treatment", "treatment_hi", "treatment_te", "tips",
+                 "names_hi", "names_te", "extra")
+
+    def __init__(self, model, name: str, info: dict):
+        self._model = model
+        self.id = -1
+        self.name = sys.intern(name)
+        for field in SYMPTOM_FIELDS:
+            values = info.get(field)
+            setattr(self, field, None if values is None else
+                    array("i", (model._symptom_id(s) for s in values)))
+        for field in TEXT_FIELDS:
+            setattr(self, field, info.get(field))
+        for field in LIST_FIELDS:
+            values = info.get(field)
+            setattr(self, field, None if values is None else tuple(values))
+        known = set(SYMPTOM_FIELDS) | set(TEXT_FIELDS) | set(LIST_FIELDS)
+        extra = {k: v for k, v in info.items() if k not in known}
+        self.extra = extra or None
+
+    def __getitem__(self, key):
+        if key in SYMPTOM_FIELDS:
+            ids = getattr(self, key)
+            if ids is None:
+                raise KeyError(key)
+            names = self._model.symptom_names
+            return [names[i] for i in ids]
+        if key in TEXT_FIELDS or key in LIST_FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return list(value) if isinstance(value, tuple) else value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for field in FIELD_ORDER:
+            if getattr(self, field) is not None:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def symptom_ids(self, field: str = None) -> Iterable[int]:
+        """Symptom ids of one language field, or of all of them."""
+        fields = (field,) if field else SYMPTOM_FIELDS
+        for f in fields:
+            ids = getattr(self, f, None)
+            if ids:
+                yield from ids
+
+
+class KBModel(MutableMapping):
+    """Illness name -> Illness, with integer ids and array-backed adjacency.
+
+    Symptom strings are interned once in symptom_names. The symptom ->
+    illness adjacency is a CSR pair of arrays that is rebuilt lazily, once,
+    after any number of edits.
+    """
+
+    def __init__(self, kb: Dict[str, dict] = None):
+        self._lock = threading.RLock()
+        self._illnesses = {}
+        self.symptom_names = []
+        self._lower_names = []        # symptom id -> interned lowercase form
+        self._symptom_ids = {}
+        self._lower_ids = {}
+        self._live_lower = []
+        self._by_id = []
+        self._indptr = array("l", [0])
+        self._adjacency = array("i")
+        self._dirty = True
+        if kb:
+            self.load(kb)
+
+    # --- Vocabulary ---
+    def _symptom_id(self, symptom: str) -> int:
+        sid = self._symptom_ids.get(symptom)
+        if sid is None:
+            symptom = sys.intern(symptom)
+            sid = self._symptom_ids[symptom] = len(self.symptom_names)
+            self.symptom_names.append(symptom)
+            lower = sys.intern(symptom.lower())
+            self._lower_names.append(lower)
+            self._lower_ids[lower] = self._lower_ids.get(lower, ()) + (sid,)
+        return sid
+
+    def symptom_vocabulary(self) -> List[str]:
+        """Every distinct lowercased symptom, in all languages, that some
+        current entry lists. Symptoms of deleted or edited entries stay
+        interned but are left out here."""
+        if self._dirty:
+            self._reindex()
+        return list(self._live_lower)
+
+    def symptom_ids_for(self, symptom: str) -> Tuple[int, ...]:
+        """Ids of every spelling of a symptom (case-insensitive)."""
+        return self._lower_ids.get(symptom.lower(), ())
+
+    def lower_symptom(self, sid: int) -> str:
+        """The interned lowercase form of a symptom id."""
+        return self._lower_names[sid]
+
+    def illness_by_id(self, iid: int) -> Illness:
+        if self._dirty:
+            self._reindex()
+        return self._by_id[iid]
+
+    # --- Mapping interface ---
+    def __getitem__(self, name):
+        return self._illnesses[name]
+
+    def __setitem__(self, name, info):
+        with self._lock:
+            self._illnesses[name] = info if isinstance(info, Illness) and info._model is self \
+                else Illness(self, name, dict(info))
+            self._dirty = True
+
+    def __delitem__(self, name):
+        with self._lock:
+            del self._illnesses[name]
+            self._dirty = True
+
+    def __iter__(self):
+        return iter(self._illnesses)
+
+    def __len__(self):
+        return len(self._illnesses)
+
+    def load(self, kb: Dict[str, dict]):
+        """Add many entries and index them once."""
+        with self._lock:
+            for name, info in kb.items():
+                self._illnesses[name] = Illness(self, name, info)
+            self._dirty = True
+
+    def to_dict(self) -> Dict[str, dict]:
+        """Plain dicts in the knowledge_base.json layout."""
+        return {name: dict(illness) for name, illness in self._illnesses.items()}
+
+    # --- Adjacency ---
+    def _reindex(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._by_id = list(self._illnesses.values())
+            per_symptom = [[] for _ in self.symptom_names]
+            for iid, illness in enumerate(self._by_id):
+                illness.id = iid
+                for sid in set(illness.symptom_ids()):
+                    per_symptom[sid].append(iid)
+            indptr = array("l", [0])
+            adjacency = array("i")
+            for ids in per_symptom:
+                adjacency.extend(ids)
+                indptr.append(len(adjacency))
+            self._indptr, self._adjacency = indptr, adjacency
+            self._live_lower = [lower for lower, sids in self._lower_ids.items()
+                                if any(indptr[sid + 1] > indptr[sid] for sid in sids)]
+            self._dirty = False
+
+    def illness_ids_for(self, symptom: str) -> set:
+        """Ids of illnesses listing the symptom (case-insensitive) in any language."""
+        if self._dirty:
+            self._reindex()
+        found = set()
+        for sid in self._lower_ids.get(symptom.lower(), ()):
+            found.update(self._adjacency[self._indptr[sid]:self._indptr[sid + 1]])
+        return found
+
+    def illnesses_for(self, symptom: str) -> List[str]:
+        return [self._by_id[i].name for i in sorted(self.illness_ids_for(symptom))]
+
+    def match_counts(self, symptoms: Iterable[str]) -> List[Tuple[str, int]]:
+        """(illness, number of given symptoms it lists), most matches first."""
+        counts = {}
+        for sym in {s.lower() for s in symptoms}:
+            for iid in self.illness_ids_for(sym):
+                counts[iid] = counts.get(iid, 0) + 1
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(self._by_id[iid].name, n) for iid, n in ranked]
+
+
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_shared_kb() -> KBModel:
+    """The process-wide KB model, loaded from knowledge_base.json on first use."""
+    global _SHARED
+    if _SHARED is None:
+        with _SHARED_LOCK:
+            if _SHARED is None:
+                from knowledge_base import load_kb
+                _SHARED = KBModel(load_kb())
+    return _SHARED
@@ -0,0 +1,212 @@
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from text_analysis import tokenize
+
+# Fields indexed for every illness, in every language
+TEXT_FIELDS = ("description", "description_hi", "description_te",
+               "treatment", "treatment_hi", "treatment_te", "tips", "names_hi", "names_te")
+
+# Question and filler words carry no information about which entry is meant
+QUESTION_WORDS = {
+    "what", "is", "are", "a", "an", "the", "how", "to", "do", "i", "can", "about", "tell", "me", "of", "for",
+    "treat", "treatment", "treatments", "treated", "cure", "cured", "symptom", "symptoms", "sign", "signs",
+    "wrong", "happening", "happened", "going", "on", "yourself", "you", "your", "my", "with", "it", "this",
+    "that", "s", "and", "or", "please", "know", "explain", "mean", "means", "disease", "illness", "condition",
+    "क्या", "है", "कैसे", "करें", "का", "की", "के", "बारे", "में", "इलाज", "होता", "लक्षण", "बताओ", "बताइए",
+    "ఏమిటి", "అంటే", "ఎలా", "గురించి", "చెప్పండి", "చికిత్స", "లక్షణాలు",
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Once this many documents sit in the delta segment it is merged into the main one
+MAX_DELTA_DOCS = 256
+
+
+def document_tokens(name: str, info: dict) -> List[str]:
+    parts = [name]
+    for field in TEXT_FIELDS:
+        value = info.get(field)
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            parts.extend(v for v in value if isinstance(v, str))
+    return list(tokenize(" ".join(parts)))
+
+
+class _Segment:
+    """Term-major (CSC-style) posting arrays for a contiguous range of doc ids."""
+    __slots__ = ("indptr", "doc_ids", "tfs")
+
+    def __init__(self, docs: List[Tuple[int, Dict[int, int]]], vocab_size: int):
+        terms, doc_ids, tfs = [], [], []
+        for doc_id, counts in docs:
+            for term_id, tf in counts.items():
+                terms.append(term_id)
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+        terms = np.asarray(terms, dtype=np.int32)
+        order = np.argsort(terms, kind="stable")
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        self.tfs = np.asarray(tfs, dtype=np.float32)[order]
+        self.indptr = np.zeros(vocab_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=vocab_size), out=self.indptr[1:])
+
+    def postings(self, term_ids: np.ndarray):
+        """Gather (term position, doc id, tf) for every posting of the given terms."""
+        known = term_ids < len(self.indptr) - 1
+        positions = np.nonzero(known)[0]
+        term_ids = term_ids[known]
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float32)
+        # Offsets of each posting inside the concatenated slices
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return np.repeat(positions, lengths), self.doc_ids[offsets], self.tfs[offsets]
+
+
+class KBRetriever:
+    """BM25 search over illness names, descriptions, treatments and tips.
+
+    Documents live in two segments: a large main segment and a small delta
+    segment holding entries added or changed since the last merge. An update
+    only rebuilds the delta; replaced documents are masked out until the next
+    merge.
+    """
+
+    def __init__(self, kb: Dict[str, dict]):
+        self._lock = threading.RLock()
+        self._vocab = {}
+        self._names = []          # doc id -> illness name
+        self._counts = []         # doc id -> {term id: tf}
+        self._doc_ids = {}        # illness name -> live doc id
+        self._alive = np.zeros(0, dtype=bool)
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._df = np.zeros(0, dtype=np.int64)
+        self._main = None
+        self._main_end = 0
+        self._delta = None
+        self.rebuild(kb)
+
+    # --- Index maintenance ---
+    def _term_counts(self, name: str, info: dict) -> Dict[int, int]:
+        counts = {}
+        for token in document_tokens(name, info):
+            term_id = self._vocab.setdefault(token, len(self._vocab))
+            counts[term_id] = counts.get(term_id, 0) + 1
+        return counts
+
+    def _grow_df(self):
+        if len(self._df) < len(self._vocab):
+            self._df = np.concatenate([self._df, np.zeros(len(self._vocab) - len(self._df), dtype=np.int64)])
+
+    def rebuild(self, kb: Dict[str, dict]):
+        """Index the whole KB from scratch."""
+        with self._lock:
+            self._vocab = {}
+            self._names = list(kb.keys())
+            self._counts = [self._term_counts(name, kb[name]) for name in self._names]
+            self._doc_ids = {name: i for i, name in enumerate(self._names)}
+            n = len(self._names)
+            self._alive = np.ones(n, dtype=bool)
+            self._lengths = np.array([sum(c.values()) for c in self._counts], dtype=np.float32)
+            self._df = np.zeros(len(self._vocab), dtype=np.int64)
+            for counts in self._counts:
+                for term_id in counts:
+                    self._df[term_id] += 1
+            self._main = _Segment(list(enumerate(self._counts)), len(self._vocab))
+            self._main_end = n
+            self._delta = None
+
+    def _forget(self, doc_id: int):
+        self._alive[doc_id] = False
+        for term_id in self._counts[doc_id]:
+            self._df[term_id] -= 1
+        self._counts[doc_id] = {}
+
+    def update(self, name: str, info: dict):
+        """Add or replace one entry."""
+        with self._lock:
+            old = self._doc_ids.get(name)
+            if old is not None:
+                self._forget(old)
+            counts = self._term_counts(name, info)
+            self._grow_df()
+            for term_id in counts:
+                self._df[term_id] += 1
+            doc_id = len(self._names)
+            self._names.append(name)
+            self._counts.append(counts)
+            self._doc_ids[name] = doc_id
+            self._alive = np.append(self._alive, True)
+            self._lengths = np.append(self._lengths, np.float32(sum(counts.values())))
+            self._refresh_delta()
+
+    def remove(self, name: str):
+        with self._lock:
+            doc_id = self._doc_ids.pop(name, None)
+            if doc_id is not None:
+                self._forget(doc_id)
+
+    def _refresh_delta(self):
+        delta_docs = range(self._main_end, len(self._names))
+        if len(delta_docs) > MAX_DELTA_DOCS:
+            self._compact()
+            return
+        self._delta = _Segment([(i, self._counts[i]) for i in delta_docs], len(self._vocab))
+
+    def _compact(self):
+        live = {name: doc_id for name, doc_id in self._doc_ids.items()}
+        names = sorted(live, key=live.get)
+        counts = [self._counts[live[name]] for name in names]
+        self._names = names
+        self._counts = counts
+        self._doc_ids = {name: i for i, name in enumerate(names)}
+        self._alive = np.ones(len(names), dtype=bool)
+        self._lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        self._main = _Segment(list(enumerate(counts)), len(self._vocab))
+        self._main_end = len(names)
+        self._delta = None
+
+    # --- Querying ---
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Return up to k (illness name, BM25 score) pairs, best first."""
+        return self.search_tokens(tokenize(query), k)
+
+    def search_tokens(self, words: Sequence[str], k: int = 3) -> List[Tuple[str, float]]:
+        """search() for an already tokenized query (e.g. MessageAnalysis.words)."""
+        tokens = [t for t in words if t not in QUESTION_WORDS]
+        with self._lock:
+            term_ids = np.array(sorted({self._vocab[t] for t in tokens if t in self._vocab}), dtype=np.int64)
+            n_docs = len(self._names)
+            n_alive = int(self._alive.sum())
+            if len(term_ids) == 0 or n_alive == 0:
+                return []
+            df = self._df[term_ids].astype(np.float64)
+            idf = np.log1p((n_alive - df + 0.5) / (df + 0.5))
+            avgdl = float(self._lengths[self._alive].mean()) or 1.0
+
+            scores = np.zeros(n_docs, dtype=np.float64)
+            for segment in (self._main, self._delta):
+                if segment is None:
+                    continue
+                term_pos, docs, tfs = segment.postings(term_ids)
+                if len(docs) == 0:
+                    continue
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._lengths[docs] / avgdl)
+                weights = idf[term_pos] * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+                scores += np.bincount(docs, weights=weights, minlength=n_docs)
+            scores[~self._alive] = 0.0
+
+            k = min(k, n_docs)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._names[i], float(scores[i])) for i in top if scores[i] > 0.0]
+
+    def __len__(self):
+        return len(self._doc_ids)
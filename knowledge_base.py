@@ -1,70 +1,92 @@
-import sqlite3
 import os
 import random
 import json
 from datetime import datetime
 
+from db_instrumentation import connect
+from language_packs import get_pack
+from schema import ensure_schema
+
 # --- Paths ---
-DB_PATH = os.path.join(os.path.dirname(__file__), "knowledge_base.db")
+DATA_DIR = os.environ.get("WELLBOT_DATA_DIR", os.path.dirname(__file__))
+DB_PATH = os.path.join(DATA_DIR, "knowledge_base.db")
 JSON_PATH = os.path.join(os.path.dirname(__file__), "knowledge_base.json")
 
 # --- SQLite DB initialization ---
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    """Create or migrate the database; a no-op after the first call in a process (see schema.py)."""
+    ensure_schema(DB_PATH)
+
+# --- In-memory response table ---
+class WeightedResponses:
+    """Canned replies for one intent, sampled in O(1) with the alias method."""
+    __slots__ = ("responses", "prob", "alias")
+
+    def __init__(self, responses, weights):
+        n = len(responses)
+        total = float(sum(weights))
+        self.responses = list(responses)
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        if total <= 0:
+            return
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def choose(self):
+        i = random.randrange(len(self.responses))
+        if random.random() < self.prob[i]:
+            return self.responses[i]
+        return self.responses[self.alias[i]]
+
+# intent -> WeightedResponses (or None when the intent has no replies)
+_RESPONSE_TABLE = {}
+
+def _load_responses(intent):
+    conn = connect(DB_PATH)
     c = conn.cursor()
-    
-    # Create tables with correct structure
-    c.execute('''CREATE TABLE IF NOT EXISTS kb_responses
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 intent TEXT NOT NULL,
-                 response TEXT NOT NULL)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS chat_history
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                 username TEXT NOT NULL,
-                 user_message TEXT NOT NULL,
-                 detected_intent TEXT,
-                 bot_reply TEXT NOT NULL,
-                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Check if we need to insert sample data
-    c.execute("SELECT COUNT(*) FROM kb_responses")
-    if c.fetchone()[0] == 0:
-        sample_data = [
-            ('greet', '👋 Hello! I\'m WellBot. How are you feeling today?'),
-            ('greet', 'Hi there! 😊 How are you doing today?'),
-            ('positive_mood', '😊 That\'s wonderful to hear!'),
-            ('thanks', 'You\'re welcome! 💙'),
-            ('goodbye', 'Goodbye! 👋 Take care!'),
-        ]
-        c.executemany("INSERT INTO kb_responses (intent, response) VALUES (?, ?)", sample_data)
-    
-    conn.commit()
+    c.execute("SELECT response, weight FROM kb_responses WHERE intent=? ORDER BY id", (intent,))
+    rows = c.fetchall()
     conn.close()
-    print("✅ Database initialized successfully")
+    if not rows:
+        return None
+    return WeightedResponses([r[0] for r in rows], [max(r[1] or 0.0, 0.0) for r in rows])
+
+def invalidate_response_table(intent=None):
+    """Drop cached replies for one intent, or for all intents when none is given."""
+    if intent is None:
+        _RESPONSE_TABLE.clear()
+    else:
+        _RESPONSE_TABLE.pop(intent, None)
 
 # --- SQLite helper functions ---
 def get_response_from_db(intent):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT response FROM kb_responses WHERE intent=?", (intent,))
-        rows = c.fetchall()
-        conn.close()
-        if not rows:
+        if intent not in _RESPONSE_TABLE:
+            _RESPONSE_TABLE[intent] = _load_responses(intent)
+        table = _RESPONSE_TABLE[intent]
+        if table is None:
             return None
-        return random.choice([r[0] for r in rows])
+        return table.choose()
     except Exception as e:
         print(f"Error getting response from DB: {e}")
         return None
 
-def add_response(intent, response):
+def add_response(intent, response, weight=1.0):
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect(DB_PATH)
         c = conn.cursor()
-        c.execute("INSERT INTO kb_responses (intent, response) VALUES (?, ?)", (intent, response))
+        c.execute("INSERT INTO kb_responses (intent, response, weight) VALUES (?, ?, ?)", (intent, response, weight))
         conn.commit()
         conn.close()
+        invalidate_response_table(intent)
         return True
     except Exception as e:
         print(f"Error adding response: {e}")
@@ -73,7 +95,7 @@ def add_response(intent, response):
 def save_chat_to_db(username, user_message, detected_intent, bot_reply):
     """Save user chat and bot reply to database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect(DB_PATH)
         c = conn.cursor()
         c.execute('''INSERT INTO chat_history 
                      (username, user_message, detected_intent, bot_reply) 
@@ -89,7 +111,7 @@ def save_chat_to_db(username, user_message, detected_intent, bot_reply):
 def get_chat_history(username=None):
     """Retrieve chat history from database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect(DB_PATH)
         c = conn.cursor()
         
         if username:
@@ -138,25 +160,12 @@ def load_kb():
 
 def format_health_info(info, topic=None, illness=None, language="English"):
     """Format a response for the chatbot with multilingual support."""
+    pack = get_pack(language)
     if not info:
-        if language == 'Hindi':
-            return "मेरे पास इसके बारे में अभी तक जानकारी नहीं है।"
-        elif language == 'Telugu':
-            return "దీని గురించి ఇంకా నాకు సమాచారం లేదు."
-        else:
-            return "I don't have information about that yet."
-    
-    # Language mapping
-    lang_map = {
-        'English': {'desc': 'description', 'treatment': 'treatment', 'warning': 'warning'},
-        'Hindi': {'desc': 'description_hi', 'treatment': 'treatment_hi', 'warning': 'warning_hi'},
-        'Telugu': {'desc': 'description_te', 'treatment': 'treatment_te', 'warning': 'warning_te'}
-    }
-    
-    current_lang = lang_map.get(language, lang_map['English'])
+        return pack.render('no_info_yet')
     
     if topic:
-        desc = info.get(current_lang['desc'], info.get('description', ''))
+        desc = pack.kb_value(info, 'description')
         tips = info.get("tips", [])
         return desc + ("\n" + "\n".join(tips) if tips else "")
     
@@ -164,41 +173,25 @@ def format_health_info(info, topic=None, illness=None, language="English"):
         parts = [f"{illness}"]
         
         # Get description in current language
-        desc = info.get(current_lang['desc'], info.get('description', ''))
+        desc = pack.kb_value(info, 'description')
         if desc:
             parts.append(desc)
         
         # Get treatment in current language
-        treatment = info.get(current_lang['treatment'], info.get('treatment', []))
+        treatment = pack.kb_value(info, 'treatment', [])
         if treatment:
-            if language == 'English':
-                parts.append("💊 Treatment:")
-            elif language == 'Hindi':
-                parts.append("💊 उपचार:")
-            elif language == 'Telugu':
-                parts.append("💊 చికిత్స:")
-            
+            parts.append(pack.render('treatment_header'))
             for treat in treatment:
                 parts.append(f"• {treat}")
         
         # Get warning in current language
-        warning = info.get(current_lang['warning'], info.get('warning', ''))
+        warning = pack.kb_value(info, 'warning')
         if warning:
-            if language == 'English':
-                parts.append(f"⚠ Important: {warning}")
-            elif language == 'Hindi':
-                parts.append(f"⚠ महत्वपूर्ण: {warning}")
-            elif language == 'Telugu':
-                parts.append(f"⚠ ముఖ్యమైన: {warning}")
+            parts.append(pack.render('warning_line', warning=warning))
         
         return "\n".join(parts)
     
-    if language == 'Hindi':
-        return "मेरे पास इसके बारे में जानकारी नहीं है।"
-    elif language == 'Telugu':
-        return "దీని గురించి నాకు సమాచారం లేదు."
-    else:
-        return "I don't have info about that yet."
+    return pack.render('no_info')
 
 # Initialize database only when this file is run directly
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+import json
+import os
+import random
+import threading
+
+# --- Paths ---
+LOCALES_DIR = os.path.join(os.path.dirname(__file__), "locales")
+DEFAULT_LANGUAGE = "English"
+
+# Display name -> bundle file in LOCALES_DIR. Adding a language only needs a
+# new bundle and one line here; nothing is read until the language is used.
+AVAILABLE_LANGUAGES = {
+    "English": "en.json",
+    "Hindi": "hi.json",
+    "Telugu": "te.json",
+}
+
+_PACKS = {}
+_PACKS_LOCK = threading.RLock()
+
+
+class LanguagePack:
+    """All user-facing strings for one language, compiled once at load time."""
+    __slots__ = ("language", "kb_suffix", "phrases", "templates", "ui")
+
+    def __init__(self, language, data):
+        self.language = language
+        self.kb_suffix = data.get("kb_suffix", "")
+        self.phrases = {k: tuple(v) for k, v in data.get("phrases", {}).items()}
+        # Bind str.format up front so rendering is a dict lookup plus a call
+        self.templates = {k: v.format for k, v in data.get("templates", {}).items()}
+        self.ui = dict(data.get("ui", {}))
+
+    def render(self, key, **values):
+        """Fill the template stored under key."""
+        return self.templates[key](**values)
+
+    def choice(self, key):
+        """Pick one of the alternative phrases stored under key."""
+        return random.choice(self.phrases[key])
+
+    def field(self, base):
+        """KB field name for this language, e.g. 'description' -> 'description_hi'."""
+        return base + self.kb_suffix
+
+    def kb_value(self, info, base, default=""):
+        """Read a KB field in this language, falling back to the English field."""
+        return info.get(base + self.kb_suffix, info.get(base, default))
+
+    def translate(self, key):
+        return self.ui.get(key, key)
+
+
+def _load_pack(language):
+    path = os.path.join(LOCALES_DIR, AVAILABLE_LANGUAGES[language])
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return LanguagePack(language, data)
+
+
+def get_pack(language=DEFAULT_LANGUAGE):
+    """Return the pack for a language, loading it on first use.
+
+    Unknown languages, or bundles that fail to load, fall back to English.
+    """
+    pack = _PACKS.get(language)
+    if pack is not None:
+        return pack
+    if language not in AVAILABLE_LANGUAGES:
+        language = DEFAULT_LANGUAGE
+    with _PACKS_LOCK:
+        pack = _PACKS.get(language)
+        if pack is None:
+            try:
+                pack = _load_pack(language)
+            except Exception as e:
+                print(f"Warning: Could not load language pack '{language}': {e}")
+                if language == DEFAULT_LANGUAGE:
+                    raise
+                return get_pack(DEFAULT_LANGUAGE)
+            _PACKS[language] = pack
+    return pack
+
+
+def available_languages():
+    return list(AVAILABLE_LANGUAGES.keys())
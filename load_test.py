@@ -0,0 +1,408 @@
+"""Concurrent-user load test for the Streamlit chat flow.
+
+Starts one headless `streamlit run app.py` server on SQLite files in a
+temporary directory and drives it with simulated browsers, one thread
+and one websocket session each: login -> several chat turns -> feedback
+-> chat history. All users of a level share that single app.py process
+(its admission limiter, session store and GIL), so the numbers show how
+many users one process can handle. Everything runs offline; the client
+side needs the websockets package, which Streamlit installs.
+
+    python load_test.py --users 1 2 4 8 16 --turns 5
+
+For every concurrency level the report shows p50/p99 latency per page,
+throughput, and the server's own counters, read from its admin pages
+before and after the level: SQLite statements from db_instrumentation
+(statements slower than --slow-ms, mostly lock waits under load,
+'database is locked' retries and statements that still failed after
+retrying) and replies the admission controller turned away. The rate
+limit is raised so that every chat turn is admitted unless
+WELLBOT_RATE_BURST/WELLBOT_RATE_PER_MINUTE are set. A page with no
+samples shows n/a; a step a user could not take (e.g. no feedback
+buttons after the last reply) counts as an error. A level where any
+simulated user crashed is reported as FAILED rather than with partial
+numbers.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+KB_PATH = os.path.join(REPO_DIR, "knowledge_base.json")
+PAGES = ("login", "chat", "feedback", "history")
+PASSWORD = "load-test"
+# Reads the server's counters from the admin pages between levels
+ADMIN_USER = "admin"
+SERVER_START_TIMEOUT = 60.0
+
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latencies = {page: [] for page in PAGES}
+        self.app_errors = 0
+        self.skipped = []
+
+    def record(self, page, seconds, exceptions=0):
+        with self.lock:
+            self.latencies[page].append(seconds)
+            self.app_errors += exceptions
+
+    def skip(self, username, step):
+        with self.lock:
+            self.skipped.append(f"{username}: {step} skipped")
+
+
+STATS = LoadStats()
+
+
+# --- Simulated browser ---
+class BrowserSession:
+    """One browser tab: a websocket session on the server and the widgets on screen.
+
+    Like the Streamlit frontend, each run sends the values the user has set
+    for widgets on screen plus at most one trigger (a click or a chat
+    message), then waits until the script, and every st.rerun it asks for,
+    has finished. Clicks inside a fragment rerun only that fragment.
+    """
+
+    def __init__(self, url, timeout):
+        from websockets.sync.client import connect
+
+        self.timeout = timeout
+        self.ws = connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=timeout).__enter__()
+        self.widgets = []            # (type, label, id, fragment_id) in page order
+        self.values = {}             # widget id -> WidgetState set by the user
+        self.metrics = {}            # metric label -> value as shown
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.ws.close()
+
+    def find(self, kind, label=None, index=0):
+        matches = [w for w in self.widgets if w[0] == kind and (label is None or w[1] == label)]
+        return matches[index] if index < len(matches) else None
+
+    def set_value(self, widget, **value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        self.values[widget[2]] = WidgetState(id=widget[2], **value)
+
+    def click(self, widget):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return self.run(WidgetState(id=widget[2], trigger_value=True), fragment_id=widget[3])
+
+    def chat(self, text):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self.find("chat_input")
+        state = WidgetState(id=widget[2])
+        state.chat_input_value.data = text
+        return self.run(state, fragment_id=widget[3])
+
+    def run(self, trigger=None, fragment_id=""):
+        """Rerun the script; returns the number of exceptions it showed."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        client_state = msg.rerun_script
+        client_state.fragment_id = fragment_id
+        on_screen = {w[2] for w in self.widgets}
+        client_state.widget_states.widgets.extend(v for k, v in self.values.items() if k in on_screen)
+        if trigger is not None:
+            client_state.widget_states.widgets.append(trigger)
+        self.ws.send(msg.SerializeToString())
+
+        widgets, metrics, exceptions = [], {}, 0
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(self.ws.recv(timeout=self.timeout))
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if element_type == "exception":
+                    exceptions += 1
+                elif element_type == "metric":
+                    metrics[proto.label] = proto.body
+                elif getattr(proto, "id", ""):
+                    widgets.append((element_type, getattr(proto, "label", ""), proto.id, fwd.delta.fragment_id))
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun(): the next run redraws the page from scratch
+                    widgets, metrics, fragment_id = [], {}, ""
+                    continue
+                if fwd.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    exceptions += 1
+                break
+
+        if fwd.script_finished == ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+            # Only the fragment was redrawn; the rest of the page stays
+            widgets = [w for w in self.widgets if w[3] != fragment_id] + widgets
+        self.widgets, self.metrics = widgets, metrics
+        return exceptions
+
+
+# --- Simulated users ---
+def load_messages():
+    with open(KB_PATH, "r", encoding="utf-8") as f:
+        kb = json.load(f)
+    symptoms = sorted({s for info in kb.values() for s in info.get("symptoms", [])})
+    return symptoms
+
+
+def create_users(data_dir, usernames):
+    conn = sqlite3.connect(os.path.join(data_dir, "user_management.db"))
+    hashed = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (username, password, email, full_name, age, gender, language) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(u, hashed, f"{u}@example.com", u, 30, "Other", "English") for u in usernames])
+    conn.commit()
+    conn.close()
+
+
+def _timed(page, action, *args):
+    start = time.perf_counter()
+    exceptions = action(*args)
+    STATS.record(page, time.perf_counter() - start, exceptions)
+
+
+def login(browser, username):
+    """Fill in the login form shown on the first page and submit it."""
+    browser.set_value(browser.find("text_input", index=0), string_value=username)
+    browser.set_value(browser.find("text_input", index=1), string_value=PASSWORD)
+    return browser.click(browser.find("button", "Login"))
+
+
+def simulate_user(url, username, turns, symptoms, seed, timeout):
+    rng = random.Random(seed)
+    with BrowserSession(url, timeout) as browser:
+        browser.run()
+        _timed("login", login, browser, username)
+        if browser.find("chat_input") is None:
+            STATS.skip(username, "chat (not logged in)")
+            return
+
+        messages = ["hello"] + [f"I have {rng.choice(symptoms)}" for _ in range(max(turns - 2, 0))] + ["what do i have"]
+        for message in messages[:turns]:
+            _timed("chat", browser.chat, message)
+
+        choice = browser.find("button", rng.choice(["👍 Yes", "👎 No"]))
+        if choice is None:
+            STATS.skip(username, "feedback")
+        else:
+            _timed("feedback", browser.click, choice)
+            comment, submit = browser.find("text_area"), browser.find("button", "Submit Feedback")
+            if comment is None or submit is None:
+                STATS.skip(username, "feedback comment")
+            else:
+                browser.set_value(comment, string_value="load test")
+                _timed("feedback", browser.click, submit)
+
+        history = browser.find("button", "View Chat History")
+        if history is None:
+            STATS.skip(username, "history")
+        else:
+            _timed("history", browser.click, history)
+
+
+def run_user(url, username, turns, symptoms, seed, timeout):
+    try:
+        simulate_user(url, username, turns, symptoms, seed, timeout)
+    except Exception as e:
+        return f"{username}: {type(e).__name__}: {e}"
+    return None
+
+
+# --- Server ---
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(data_dir, env):
+    """Start `streamlit run app.py` and wait until it answers its health check."""
+    port = _free_port()
+    log_path = os.path.join(data_dir, "server.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+             "--server.address", "127.0.0.1", "--server.port", str(port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {server.returncode}, see {log_path}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return server, f"ws://127.0.0.1:{port}/_stcore/stream"
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"streamlit did not start within {SERVER_START_TIMEOUT:g} s, see {log_path}")
+
+
+class ServerCounters:
+    """Reads db_instrumentation and admission counters off the admin pages."""
+
+    def __init__(self, url, timeout):
+        self.browser = BrowserSession(url, timeout)
+        # The first run also pays the server's one-off import cost before any user is timed
+        self.browser.run()
+        login(self.browser, ADMIN_USER)
+        self.browser.click(self.browser.find("button", "Admin Panel"))
+        self.tabs = self.browser.find("radio", "Admin section")
+        self.overhead = 0
+        # Statements the admin reads themselves run between two snapshots
+        first = self.snapshot()
+        self.overhead = self.snapshot()["queries"] - first["queries"]
+
+    def _show(self, tab):
+        self.browser.set_value(self.tabs, string_value=tab)
+        self.browser.run()
+        return {label: int(value) for label, value in self.browser.metrics.items() if value.isdigit()}
+
+    def snapshot(self):
+        dashboard = self._show("Dashboard")
+        db = self._show("DB Performance")
+        slow = next((v for k, v in db.items() if k.startswith("Slow")), 0)
+        return {"queries": db["Queries"] - self.overhead, "slow": slow, "lock_retries": db["Lock Retries"],
+                "lock_errors": db["Lock Errors"],
+                "rejected": dashboard["Rate Limited"] + dashboard["Rejected (Busy)"]}
+
+    def close(self):
+        self.browser.close()
+
+
+# --- Reporting ---
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_level(url, counters, users, turns, symptoms, seed, timeout, data_dir):
+    STATS.reset()
+    usernames = [f"load_{users}_{i}" for i in range(users)]
+    create_users(data_dir, usernames)
+
+    before = counters.snapshot()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(run_user, url, u, turns, symptoms, seed + i, timeout)
+                   for i, u in enumerate(usernames)]
+        failures = [f.result() for f in futures if f.result()]
+    wall = time.perf_counter() - start
+    after = counters.snapshot()
+    db = {key: after[key] - before[key] for key in before}
+
+    interactions = sum(len(v) for v in STATS.latencies.values())
+    row = {"users": users, "failed_users": len(failures), "failures": failures, "skipped": STATS.skipped,
+           "interactions": interactions, "wall_s": wall,
+           "throughput": interactions / wall if wall else 0.0,
+           "queries": db["queries"], "slow": db["slow"], "lock_retries": db["lock_retries"],
+           "lock_errors": db["lock_errors"], "rejected": db["rejected"],
+           "errors": STATS.app_errors + len(STATS.skipped) + len(failures)}
+    for page in PAGES:
+        for pct in (50, 99):
+            value = percentile(STATS.latencies[page], pct)
+            row[f"{page}_p{pct}"] = None if value is None else 1000.0 * value
+    return row
+
+
+def _ms(value):
+    return "n/a" if value is None else f"{value:.1f}"
+
+
+def print_row(row):
+    if row["failed_users"]:
+        print(f"{row['users']:>5}  FAILED: {row['failed_users']}/{row['users']} simulated users crashed, "
+              f"no numbers reported for this level")
+        for failure in sorted(set(row["failures"])):
+            print(f"       {failure}")
+        return
+    pages = "  ".join(f"{_ms(row[f'{p}_p50']):>7}/{_ms(row[f'{p}_p99']):<7}" for p in PAGES)
+    print(f"{row['users']:>5}  {row['throughput']:>8.2f}  {pages}  "
+          f"{row['queries']:>7}  {row['slow']:>6}  {row['lock_retries']:>7}  {row['lock_errors']:>6}  "
+          f"{row['rejected']:>8}  {row['errors']:>6}")
+    for skipped in row["skipped"]:
+        print(f"       {skipped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="concurrency levels to run, in order")
+    parser.add_argument("--turns", type=int, default=5, help="chat messages per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for one script run")
+    parser.add_argument("--slow-ms", type=float, default=50.0,
+                        help="statements slower than this count as slow")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    # The server gets throwaway databases; this process only adds users to them
+    data_dir = tempfile.mkdtemp(prefix="wellbot_load_")
+    env = dict(os.environ, WELLBOT_DATA_DIR=data_dir, WELLBOT_SLOW_QUERY_MS=str(args.slow_ms))
+    # Admit every chat turn of a run, or canned rate-limit replies would be timed as chat
+    env.setdefault("WELLBOT_RATE_BURST", str(args.turns))
+    env.setdefault("WELLBOT_RATE_PER_MINUTE", str(60 * args.turns))
+    os.environ["WELLBOT_DATA_DIR"] = data_dir
+
+    from schema import ensure_schema
+    ensure_schema(*(os.path.join(data_dir, name) for name in ("user_management.db", "feedback_data.db", "knowledge_base.db")))
+    create_users(data_dir, [ADMIN_USER])
+
+    symptoms = load_messages()
+    print(f"data dir: {data_dir}")
+    server, url = start_server(data_dir, env)
+    try:
+        counters = ServerCounters(url, args.timeout)
+        header = "  ".join(f"{p + ' p50/p99 ms':<15}" for p in PAGES)
+        print(f"{'users':>5}  {'req/s':>8}  {header}  {'queries':>7}  {'slow':>6}  {'retries':>7}  {'locked':>6}  {'rejected':>8}  {'errors':>6}")
+        results = []
+        for users in args.users:
+            row = run_level(url, counters, users, args.turns, symptoms, args.seed, args.timeout, data_dir)
+            results.append(row)
+            print_row(row)
+        counters.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
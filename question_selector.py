@@ -0,0 +1,142 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from language_packs import get_pack
+
+# Per-turn budget for picking a follow-up question: at most this many
+# symptoms are scored. A count, not a time limit, so the chosen question
+# does not depend on machine load (replays must be deterministic).
+MAX_EVALUATED_SYMPTOMS = 200
+
+
+def _binary_entropy(p: float) -> float:
+    if p <= 0.0 or p >= 1.0:
+        return 0.0
+    return -(p * math.log2(p) + (1.0 - p) * math.log2(1.0 - p))
+
+
+class _LanguageIndex:
+    """One language's view of the KB model, held as integer ids.
+
+    ranked lists the language's lowercase symptoms, most widely shared
+    first; rank_of maps a KB symptom id to its position in ranked (-1 when
+    the symptom is not in this language's field). The symptom -> illness
+    lists are the model's own CSR adjacency, so nothing per illness name
+    is stored here.
+    """
+    __slots__ = ("field", "ranked", "rank_of")
+
+    def __init__(self, kb, field: str):
+        self.field = field
+        counts = {}
+        for illness in kb.values():
+            for lower in {kb.lower_symptom(sid) for sid in illness.symptom_ids(field)}:
+                counts[lower] = counts.get(lower, 0) + 1
+        # Most widely shared symptoms first, so a truncated scan still
+        # looks at the questions most likely to be informative
+        self.ranked = sorted(counts, key=lambda s: (-counts[s], s))
+        position = {lower: r for r, lower in enumerate(self.ranked)}
+        self.rank_of = array("i", (position.get(kb.lower_symptom(sid), -1)
+                                   for sid in range(len(kb.symptom_names))))
+
+    def rank(self, symptom_ids) -> int:
+        """Position of a symptom (given as its KB ids) in ranked, or -1."""
+        rank_of = self.rank_of
+        return max((rank_of[sid] for sid in symptom_ids if sid < len(rank_of)), default=-1)
+
+    def ranks(self, illness) -> set:
+        rank_of = self.rank_of
+        return {rank_of[sid] for sid in illness.symptom_ids(self.field) if sid < len(rank_of)} - {-1}
+
+
+class QuestionSelector:
+    """Picks the follow-up symptom that best splits the candidate illnesses.
+
+    Works on a KBModel: illnesses are weighted by integer id and symptom
+    -> illness lookups go through the model's adjacency. Each language
+    only needs a ranking of its symptom field, built the first time the
+    language is asked about.
+    """
+
+    def __init__(self, kb):
+        self.kb = kb
+        self._indexes = {}
+
+    def invalidate(self):
+        self._indexes.clear()
+
+    def _index(self, language: str) -> _LanguageIndex:
+        index = self._indexes.get(language)
+        if index is None:
+            index = self._indexes[language] = _LanguageIndex(self.kb, get_pack(language).field("symptoms"))
+        return index
+
+    def candidate_weights(self, reported: Iterable[str], denied: Iterable[str],
+                          language: str) -> Dict[int, float]:
+        """Weight each illness id by how many reported symptoms it explains.
+
+        Illnesses that have a symptom the user said they do not have are
+        dropped, unless that would leave nothing to choose from.
+        """
+        index = self._index(language)
+        weights = {}
+        for sym in {s.lower() for s in reported}:
+            # Symptoms from another language's field say nothing here
+            if index.rank(self.kb.symptom_ids_for(sym)) < 0:
+                continue
+            for iid in self.kb.illness_ids_for(sym):
+                weights[iid] = weights.get(iid, 0.0) + 1.0
+        if not weights:
+            weights = dict.fromkeys(range(len(self.kb)), 1.0)
+        denied_ranks = {index.rank(self.kb.symptom_ids_for(d)) for d in denied} - {-1}
+        if denied_ranks:
+            kept = {iid: w for iid, w in weights.items()
+                    if not (index.ranks(self.kb.illness_by_id(iid)) & denied_ranks)}
+            if kept:
+                weights = kept
+        return weights
+
+    def next_symptom(self, reported: Iterable[str], language: str = "English",
+                     asked: Iterable[str] = (), denied: Iterable[str] = ()) -> Optional[str]:
+        """Return the unasked symptom with maximum expected information gain.
+
+        Answers are treated as deterministic given the illness, so the gain
+        of asking about a symptom is the binary entropy of the weighted share
+        of candidates that have it. The scan stops after scoring
+        MAX_EVALUATED_SYMPTOMS symptoms and returns the best one seen so far.
+        """
+        reported = [s.lower() for s in reported]
+        denied = [d.lower() for d in denied]
+        index = self._index(language)
+        weights = self.candidate_weights(reported, denied, language)
+        total = sum(weights.values())
+        if not total:
+            return None
+        skip = set(reported) | set(denied) | {a.lower() for a in asked}
+
+        # Only symptoms of the candidates can split them
+        if len(weights) < len(self.kb):
+            pool = set()
+            for iid in weights:
+                pool |= index.ranks(self.kb.illness_by_id(iid))
+            candidates = [index.ranked[r] for r in sorted(pool)]
+        else:
+            candidates = index.ranked
+
+        best, best_gain = None, -1.0
+        evaluated = 0
+        for sym in candidates:
+            if sym in skip:
+                continue
+            if evaluated >= MAX_EVALUATED_SYMPTOMS:
+                break
+            evaluated += 1
+            share = sum(weights.get(iid, 0.0) for iid in self.kb.illness_ids_for(sym)) / total
+            gain = _binary_entropy(share)
+            if gain > best_gain:
+                best, best_gain = sym, gain
+        return best
+
+    def language_symptoms(self, language: str) -> List[str]:
+        return list(self._index(language).ranked)
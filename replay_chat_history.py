@@ -0,0 +1,191 @@
+"""Replay recorded chat_history through the dialogue engine.
+
+Rows are read in their recorded order and fed to
+dialogue_manager.get_bot_reply the way render_chat does: the intent is
+detected first, and the language is the user's profile language. Every
+run starts from an empty session store in a temporary directory. It uses
+a seeded random, so two runs over the same rows give the same replies.
+A session is dropped when the recorded gap between two turns of a user
+is longer than the session TTL, as it would have expired in production.
+
+    python replay_chat_history.py --db knowledge_base.db --users-db user_management.db
+    python replay_chat_history.py --json run.json
+    python replay_chat_history.py --baseline run.json      # compare with an earlier replay
+
+The report shows per-turn latency (overall and per intent), throughput,
+and every turn whose intent or reply differs from the stored
+detected_intent/bot_reply (or from the --baseline run). Replies picked at
+random from the language packs differ from production rows by design, so
+use --baseline when checking for regressions between code versions.
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("WELLBOT_DATA_DIR", REPO_DIR)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# --- Recorded traffic ---
+def _open_readonly(path):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def load_turns(db_path, username=None, limit=None):
+    conn = _open_readonly(db_path)
+    query = "SELECT id, timestamp, username, user_message, detected_intent, bot_reply FROM chat_history"
+    params = []
+    if username:
+        query += " WHERE username = ?"
+        params.append(username)
+    query += " ORDER BY timestamp, id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    columns = ["id", "timestamp", "username", "user_message", "detected_intent", "bot_reply"]
+    turns = [dict(zip(columns, row)) for row in conn.execute(query, params)]
+    conn.close()
+    return turns
+
+
+def load_user_languages(users_db):
+    if not users_db or not os.path.exists(users_db):
+        return {}
+    try:
+        conn = _open_readonly(users_db)
+        languages = dict(conn.execute("SELECT username, language FROM users"))
+        conn.close()
+        return languages
+    except sqlite3.Error as e:
+        print(f"Warning: Could not read user languages: {e}")
+        return {}
+
+
+def _parse_timestamp(value):
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+# --- Replay ---
+def replay(turns, languages, seed, default_language="English"):
+    import dialogue_manager as dm
+
+    random.seed(seed)
+    last_seen = {}
+    results = []
+    start = time.perf_counter()
+    for turn in turns:
+        user_id = f"replay:{turn['username']}"
+        recorded_at = _parse_timestamp(turn["timestamp"])
+        previous = last_seen.get(user_id)
+        if previous and recorded_at and (recorded_at - previous).total_seconds() > dm.SESSION_TTL_SECONDS:
+            dm.drop_session(user_id)
+        if recorded_at:
+            last_seen[user_id] = recorded_at
+
+        language = languages.get(turn["username"], default_language)
+        t = time.perf_counter()
+        intent = dm.detect_rule_based_intent(turn["user_message"])
+        reply = dm.get_bot_reply(user_id, turn["user_message"], intent=intent, language=language)
+        elapsed = time.perf_counter() - t
+        results.append({"id": turn["id"], "username": turn["username"], "user_message": turn["user_message"],
+                        "language": language, "ms": 1000.0 * elapsed,
+                        "intent": intent, "reply": reply,
+                        "expected_intent": turn["detected_intent"], "expected_reply": turn["bot_reply"]})
+    wall = time.perf_counter() - start
+    return results, wall
+
+
+def apply_baseline(results, baseline_path):
+    """Compare against an earlier replay instead of the stored rows."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {t["id"]: t for t in json.load(f)["turns"]}
+    for result in results:
+        previous = baseline.get(result["id"])
+        if previous:
+            result["expected_intent"] = previous["intent"]
+            result["expected_reply"] = previous["reply"]
+
+
+# --- Reporting ---
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_row(label, values):
+    return (f"{label:<18} {len(values):>6}  {percentile(values, 50):>8.2f}  {percentile(values, 90):>8.2f}  "
+            f"{percentile(values, 99):>8.2f}  {max(values, default=0.0):>8.2f}")
+
+
+def print_report(results, wall, show_diffs):
+    latencies = [r["ms"] for r in results]
+    print(f"turns {len(results)}  users {len({r['username'] for r in results})}  "
+          f"wall {wall:.2f} s  throughput {len(results) / wall if wall else 0.0:.1f} turns/s")
+    print(f"{'latency ms':<18} {'turns':>6}  {'p50':>8}  {'p90':>8}  {'p99':>8}  {'max':>8}")
+    print(latency_row("all", latencies))
+    by_intent = {}
+    for r in results:
+        by_intent.setdefault(r["intent"], []).append(r["ms"])
+    for intent in sorted(by_intent, key=lambda i: -len(by_intent[i])):
+        print(latency_row(f"  {intent}", by_intent[intent]))
+
+    intent_changed = [r for r in results if r["intent"] != r["expected_intent"]]
+    reply_changed = [r for r in results if r["reply"] != r["expected_reply"]]
+    print(f"intent changed {len(intent_changed)}/{len(results)}  reply changed {len(reply_changed)}/{len(results)}")
+
+    for r in reply_changed[:show_diffs]:
+        print(f"\n--- row {r['id']} ({r['username']}, {r['language']}): {r['user_message']!r}")
+        if r["intent"] != r["expected_intent"]:
+            print(f"intent: {r['expected_intent']} -> {r['intent']}")
+        diff = difflib.unified_diff((r["expected_reply"] or "").splitlines(), r["reply"].splitlines(),
+                                    "expected", "replayed", lineterm="", n=1)
+        print("\n".join(diff))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join(DATA_DIR, "knowledge_base.db"),
+                        help="database holding chat_history (opened read-only)")
+    parser.add_argument("--users-db", default=os.path.join(DATA_DIR, "user_management.db"),
+                        help="user database, for each user's profile language")
+    parser.add_argument("--user", help="replay a single user's turns")
+    parser.add_argument("--limit", type=int, help="replay at most this many turns")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="compare with a --json file from an earlier replay")
+    parser.add_argument("--show-diffs", type=int, default=10, help="reply diffs to print")
+    parser.add_argument("--json", help="also write every replayed turn to this file")
+    args = parser.parse_args()
+
+    turns = load_turns(args.db, args.user, args.limit)
+    languages = load_user_languages(args.users_db)
+
+    # Sessions and any databases the engine opens go to a throwaway directory
+    data_dir = tempfile.mkdtemp(prefix="wellbot_replay_")
+    os.environ["WELLBOT_DATA_DIR"] = data_dir
+    print(f"data dir: {data_dir}")
+
+    results, wall = replay(turns, languages, args.seed)
+    if args.baseline:
+        apply_baseline(results, args.baseline)
+    print_report(results, wall, args.show_diffs)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "wall_s": wall, "turns": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
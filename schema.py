@@ -0,0 +1,122 @@
+"""Versioned schema for the SQLite databases.
+
+Each database records the schema version it is at in PRAGMA user_version.
+ensure_schema() applies the migrations above that version in a single
+transaction. After that it remembers the path, so every later call in
+the process returns without touching the database.
+
+To change a schema, append a new version to MIGRATIONS. Never edit a
+version that has already shipped.
+"""
+import os
+import threading
+
+from db_instrumentation import connect
+
+
+def _add_response_weight(c):
+    # kb_responses tables created before weighted replies lack the column
+    columns = [row[1] for row in c.execute("PRAGMA table_info(kb_responses)")]
+    if "weight" not in columns:
+        c.execute("ALTER TABLE kb_responses ADD COLUMN weight REAL NOT NULL DEFAULT 1.0")
+
+
+def _seed_responses(c):
+    c.execute("SELECT COUNT(*) FROM kb_responses")
+    if c.fetchone()[0] == 0:
+        sample_data = [
+            ('greet', '👋 Hello! I\'m WellBot. How are you feeling today?'),
+            ('greet', 'Hi there! 😊 How are you doing today?'),
+            ('positive_mood', '😊 That\'s wonderful to hear!'),
+            ('thanks', 'You\'re welcome! 💙'),
+            ('goodbye', 'Goodbye! 👋 Take care!'),
+        ]
+        c.executemany("INSERT INTO kb_responses (intent, response) VALUES (?, ?)", sample_data)
+
+
+# Database file name -> list of versions; version N is MIGRATIONS[name][N - 1].
+# A step is an SQL statement or a function taking a cursor. Version 1 also
+# brings databases created before versioning up to date, so every step in
+# it is safe to run on an existing table.
+MIGRATIONS = {
+    "user_management.db": [
+        (
+            '''CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL, email TEXT NOT NULL, full_name TEXT NOT NULL, age INTEGER NOT NULL, gender TEXT NOT NULL, language TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        ),
+    ],
+    "feedback_data.db": [
+        (
+            '''CREATE TABLE IF NOT EXISTS feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, user_query TEXT NOT NULL, bot_reply TEXT NOT NULL, is_positive INTEGER NOT NULL, comment TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        ),
+    ],
+    "knowledge_base.db": [
+        (
+            '''CREATE TABLE IF NOT EXISTS kb_responses
+               (id INTEGER PRIMARY KEY AUTOINCREMENT,
+               intent TEXT NOT NULL,
+               response TEXT NOT NULL,
+               weight REAL NOT NULL DEFAULT 1.0)''',
+            _add_response_weight,
+            "CREATE INDEX IF NOT EXISTS idx_kb_responses_intent ON kb_responses(intent)",
+            '''CREATE TABLE IF NOT EXISTS chat_history
+               (id INTEGER PRIMARY KEY AUTOINCREMENT,
+               username TEXT NOT NULL,
+               user_message TEXT NOT NULL,
+               detected_intent TEXT,
+               bot_reply TEXT NOT NULL,
+               timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+            _seed_responses,
+        ),
+    ],
+}
+
+_ready = set()
+_lock = threading.Lock()
+
+
+def schema_version(name: str) -> int:
+    return len(MIGRATIONS[name])
+
+
+def migrate(path: str) -> int:
+    """Bring one database to the latest version. Returns the versions applied."""
+    versions = MIGRATIONS[os.path.basename(path)]
+    conn = connect(path, isolation_level=None)
+    try:
+        c = conn.cursor()
+        if c.execute("PRAGMA user_version").fetchone()[0] >= len(versions):
+            return 0
+        # Take the write lock before re-reading, so two processes starting
+        # together do not both migrate
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            current = c.execute("PRAGMA user_version").fetchone()[0]
+            for steps in versions[current:]:
+                for step in steps:
+                    if callable(step):
+                        step(c)
+                    else:
+                        c.execute(step)
+            c.execute(f"PRAGMA user_version = {len(versions)}")
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        return max(len(versions) - current, 0)
+    finally:
+        conn.close()
+
+
+def ensure_schema(*paths: str):
+    """Migrate each database once per process; later calls are set lookups."""
+    for path in paths:
+        key = os.path.abspath(path)
+        if key in _ready:
+            continue
+        with _lock:
+            if key in _ready:
+                continue
+            applied = migrate(path)
+            if applied:
+                print(f"✅ {os.path.basename(path)} schema at version {schema_version(os.path.basename(path))}")
+            _ready.add(key)
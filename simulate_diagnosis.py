@@ -0,0 +1,143 @@
+"""Simulate symptom dialogues and measure turns-to-diagnosis.
+
+Every illness in the knowledge base is played by a scripted user who opens
+with one of its symptoms plus one unrelated symptom, then answers each
+follow-up question truthfully. The same cases are run once per question
+strategy so the averages can be compared directly.
+
+    python simulate_diagnosis.py --runs 20 --max-turns 15
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import dialogue_manager as dm
+from language_packs import get_pack
+
+YES_NO = {
+    "English": ("yes", "no"),
+    "Hindi": ("हाँ", "नहीं"),
+    "Telugu": ("అవును", "లేదు"),
+}
+
+
+def build_cases(languages, runs, seed):
+    """Return (illness, language, opening symptoms, true symptoms) tuples."""
+    rng = random.Random(seed)
+    cases = []
+    for language in languages:
+        field = get_pack(language).field("symptoms")
+        vocab = sorted({s.lower() for info in dm.KB.values() for s in info.get(field, [])})
+        for illness, info in dm.KB.items():
+            true_syms = [s.lower() for s in info.get(field, [])]
+            if len(true_syms) < 2:
+                continue
+            for _ in range(runs):
+                opening = rng.choice(true_syms)
+                # A distractor that no illness shares with the opening symptom,
+                # so the bot cannot diagnose straight away
+                distractors = [
+                    s for s in vocab
+                    if s not in true_syms and not any(
+                        opening in {x.lower() for x in other.get(field, [])}
+                        and s in {x.lower() for x in other.get(field, [])}
+                        for other in dm.KB.values())
+                ]
+                if not distractors:
+                    continue
+                cases.append((illness, language, [opening, rng.choice(distractors)], set(true_syms)))
+    return cases
+
+
+def run_case(illness, language, opening, true_syms, max_turns):
+    user_id = "sim_user"
+    dm.user_sessions.pop(user_id, None)
+    pack = get_pack(language)
+    disclaimer = pack.render("disclaimer")
+    yes, no = YES_NO[language]
+    revealed = set(opening)
+    message = " and ".join(opening)
+    latencies = []
+
+    for turn in range(1, max_turns + 1):
+        start = time.perf_counter()
+        # Intent detection is bypassed so the run measures question selection only
+        reply = dm.get_bot_reply(user_id, message, intent="unknown", language=language)
+        latencies.append(time.perf_counter() - start)
+        if reply.startswith(disclaimer):
+            conditions = reply.rsplit(": ", 1)[-1].split(", ")
+            return turn, conditions, latencies
+
+        pending = dm.user_sessions.get(user_id, {}).get("pending")
+        if pending:
+            message = yes if pending in true_syms else no
+            revealed.add(pending)
+        else:
+            # Generic prompt: volunteer another symptom if there is one left
+            left = sorted(true_syms - revealed)
+            if left:
+                message = left[0]
+                revealed.add(left[0])
+            else:
+                message = no
+    return None, [], latencies
+
+
+def run_strategy(strategy, cases, max_turns, seed):
+    dm.QUESTION_STRATEGY = strategy
+    random.seed(seed)
+    turns, latencies = [], []
+    diagnosed = top1 = top3 = 0
+    for illness, language, opening, true_syms in cases:
+        n, conditions, lat = run_case(illness, language, opening, true_syms, max_turns)
+        latencies.extend(lat)
+        turns.append(n if n is not None else max_turns)
+        if n is not None:
+            diagnosed += 1
+            top1 += bool(conditions) and conditions[0] == illness
+            top3 += illness in conditions
+    total = len(cases) or 1
+    return {
+        "strategy": strategy,
+        "cases": len(cases),
+        "avg_turns": statistics.mean(turns) if turns else 0.0,
+        "median_turns": statistics.median(turns) if turns else 0.0,
+        "diagnosed_pct": 100.0 * diagnosed / total,
+        "top1_pct": 100.0 * top1 / total,
+        "top3_pct": 100.0 * top3 / total,
+        "turn_ms": 1000.0 * statistics.mean(latencies) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="cases per illness and language")
+    parser.add_argument("--max-turns", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--languages", nargs="+", default=["English", "Hindi", "Telugu"])
+    parser.add_argument("--strategies", nargs="+", default=["random", "info_gain"])
+    args = parser.parse_args()
+
+    # Keep simulated sessions out of the real session store
+    dm.SESSIONS_FILE = os.path.join(tempfile.mkdtemp(), "user_sessions.json")
+    saved_sessions = dict(dm.user_sessions)
+    dm.user_sessions.clear()
+
+    cases = build_cases(args.languages, args.runs, args.seed)
+    print(f"{'strategy':<10} {'cases':>6} {'avg turns':>10} {'median':>7} "
+          f"{'diagnosed':>10} {'top-1':>7} {'top-3':>7} {'ms/turn':>8}")
+    try:
+        for strategy in args.strategies:
+            r = run_strategy(strategy, cases, args.max_turns, args.seed)
+            print(f"{r['strategy']:<10} {r['cases']:>6} {r['avg_turns']:>10.2f} {r['median_turns']:>7.1f} "
+                  f"{r['diagnosed_pct']:>9.1f}% {r['top1_pct']:>6.1f}% {r['top3_pct']:>6.1f}% {r['turn_ms']:>8.3f}")
+    finally:
+        dm.user_sessions.clear()
+        dm.user_sessions.update(saved_sessions)
+
+
+if __name__ == "__main__":
+    main()
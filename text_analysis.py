@@ -0,0 +1,71 @@
+import re
+from functools import lru_cache
+from typing import Tuple
+
+# Devanagari and Telugu digits -> ASCII, one character for one so offsets hold
+_DIGITS = {0x0966 + i: str(i) for i in range(10)}
+_DIGITS.update({0x0C66 + i: str(i) for i in range(10)})
+
+# Word characters plus the Indic vowel signs and viramas that \w leaves out.
+# The danda (U+0964/0965) ends a token like any other punctuation.
+TOKEN_PATTERN = re.compile(r"[\w\u0900-\u0963\u0966-\u097F\u0C00-\u0C7F]+")
+
+SCRIPT_LANGUAGES = {"Devanagari": "Hindi", "Telugu": "Telugu"}
+
+
+def normalize(text: str) -> str:
+    """Lowercase and map Devanagari/Telugu digits to ASCII digits."""
+    return text.translate(_DIGITS).lower()
+
+
+def _script_of(ch: str) -> str:
+    cp = ord(ch)
+    if 0x0900 <= cp <= 0x097F:
+        return "Devanagari"
+    if 0x0C00 <= cp <= 0x0C7F:
+        return "Telugu"
+    if ch.isascii() and ch.isalpha():
+        return "Latin"
+    return None
+
+
+class MessageAnalysis:
+    """Everything the dialogue stages need to know about one message.
+
+    normalized is the lowercased text with ASCII digits; tokens are
+    (token, start, end) triples with offsets into normalized, and
+    word_set holds the same words for set tests against word lists.
+    """
+    __slots__ = ("text", "normalized", "tokens", "words", "word_set", "scripts", "language")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.normalized = normalize(text)
+        self.tokens = tuple((m.group(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(self.normalized))
+        self.words = tuple(t[0] for t in self.tokens)
+        self.word_set = frozenset(self.words)
+
+        scripts = {}
+        for ch in self.normalized:
+            script = _script_of(ch)
+            if script:
+                scripts[script] = scripts.get(script, 0) + 1
+        self.scripts = scripts
+
+        # The Indic script with the most characters decides; otherwise English
+        indic = [(n, s) for s, n in scripts.items() if s in SCRIPT_LANGUAGES]
+        self.language = SCRIPT_LANGUAGES[max(indic)[1]] if indic else "English"
+
+    def has_phrase(self, phrase: Tuple[str, ...]) -> bool:
+        n = len(phrase)
+        return any(self.words[i:i + n] == phrase for i in range(len(self.words) - n + 1))
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    return tuple(TOKEN_PATTERN.findall(normalize(text)))
+
+
+@lru_cache(maxsize=256)
+def analyze_message(text: str) -> MessageAnalysis:
+    """Analyze a message once; repeat calls for the same text hit the cache."""
+    return MessageAnalysis(text)